@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure package import time in fresh interpreters and guard against eager imports."""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from src.sentinel2_classifier import setup_logger
+
+# Setup logging
+logger = setup_logger("benchmark_imports", level="INFO")
+
+HEAVY_MODULES = ["sklearn", "scipy", "rasterio", "pyproj", "matplotlib"]
+
+# Import statement -> heavy modules it must not pull in
+CASES = {
+    "import src.sentinel2_classifier": HEAVY_MODULES,
+    "from src.sentinel2_classifier import setup_logger": HEAVY_MODULES,
+    # What check_raster.py needs
+    "from src.sentinel2_classifier.raster_info import scan_rasters": [
+        "sklearn",
+        "scipy",
+        "matplotlib",
+    ],
+    "from src.sentinel2_classifier import Sentinel2Classifier": ["matplotlib"],
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(statement: str, repeats: int) -> dict:
+    """Run *statement* in *repeats* fresh interpreters; return best time and modules."""
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return {
+        "seconds": min(run["seconds"] for run in runs),
+        "modules": set(runs[0]["modules"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=0.5,
+        help="Budget for statements that must stay free of heavy modules",
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for statement, forbidden in CASES.items():
+        result = measure(statement, args.repeats)
+        loaded = [name for name in forbidden if name in result["modules"]]
+        logger.info(f"{result['seconds'] * 1000:8.1f} ms  {statement}")
+        if loaded:
+            failures.append(f"{statement!r} imports {', '.join(loaded)}")
+        if forbidden == HEAVY_MODULES and result["seconds"] > args.max_seconds:
+            failures.append(
+                f"{statement!r} took {result['seconds']:.2f}s "
+                f"(budget {args.max_seconds}s)"
+            )
+
+    for failure in failures:
+        logger.error(failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
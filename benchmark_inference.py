@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compare a pickled sklearn forest with the same forest saved in the compact format.
+
+Reports file size, load time and predict throughput of both, and checks that
+the forest loaded from the compact file predicts exactly like the original.
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.sentinel2_classifier import setup_logger
+from src.sentinel2_classifier.classifier import Sentinel2Classifier
+
+# Setup logging
+logger = setup_logger("benchmark_inference", level="INFO")
+
+
+def make_pixels(n_pixels: int, n_bands: int, rng: np.random.Generator):
+    """Synthetic uint16 reflectances with labels from a few band thresholds."""
+    pixels = rng.integers(1, 10000, (n_pixels, n_bands), dtype=np.uint16)
+    labels = (
+        (pixels[:, 0] > 3000).astype(int)
+        + (pixels[:, 1 % n_bands] > pixels[:, 2 % n_bands])
+        + 2 * (pixels[:, -1] > 6000)
+    )
+    # Label noise so trees grow to a realistic depth
+    noisy = rng.random(n_pixels) < 0.1
+    labels[noisy] = rng.integers(0, labels.max() + 1, int(noisy.sum()))
+    return pixels, labels
+
+
+def best_time(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bands", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=50)
+    parser.add_argument("--train-pixels", type=int, default=50000)
+    parser.add_argument("--pixels", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=1, help="sklearn predict threads")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    train_pixels, train_labels = make_pixels(args.train_pixels, args.bands, rng)
+    pixels, _ = make_pixels(args.pixels, args.bands, rng)
+
+    logger.info(f"Training {args.trees}-tree forest on {args.train_pixels} pixels")
+    estimator = RandomForestClassifier(
+        n_estimators=args.trees, random_state=42, n_jobs=-1
+    )
+    estimator.fit(train_pixels.astype(np.float32), train_labels)
+    estimator.n_jobs = args.n_jobs
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, "model.pkl")
+        forest_path = os.path.join(tmp_dir, "model.s2rf")
+        Sentinel2Classifier(estimator).save_model(pickle_path)
+        Sentinel2Classifier(estimator).export_model(forest_path)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f)
+
+        def load_forest():
+            classifier = Sentinel2Classifier(estimator)
+            classifier.load_model(forest_path)
+            return classifier.classifier
+
+        for name, path, load in [
+            ("pickle", pickle_path, load_pickle),
+            ("compact", forest_path, load_forest),
+        ]:
+            logger.info(
+                f"{name:8s} {os.path.getsize(path) / 1e6:8.2f} MB  "
+                f"load {best_time(load, args.repeats):6.3f}s"
+            )
+        loaded = load_forest()
+    loaded.n_jobs = args.n_jobs
+
+    float_pixels = pixels.astype(np.float32)
+    if not np.array_equal(
+        estimator.predict_proba(float_pixels), loaded.predict_proba(float_pixels)
+    ):
+        raise SystemExit("Compact-format forest probabilities differ from sklearn")
+
+    runs = {
+        "original": lambda: estimator.predict(float_pixels),
+        "from compact file": lambda: loaded.predict(float_pixels),
+    }
+    baseline = None
+    for name, run in runs.items():
+        seconds = best_time(run, args.repeats)
+        baseline = baseline or seconds
+        logger.info(
+            f"{name:18s} {seconds:7.3f}s  {args.pixels / seconds:12,.0f} pixels/s  "
+            f"x{baseline / seconds:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark fit time, predict throughput, peak memory and model size per estimator."""
+
+import argparse
+import json
+
+from src.sentinel2_classifier import setup_logger
+from src.sentinel2_classifier.benchmark import (
+    DEFAULT_ESTIMATORS,
+    DEFAULT_MAX_TRAIN_PIXELS,
+    DEFAULT_SIZES,
+    run_benchmarks,
+    write_report,
+)
+
+# Setup logging
+logger = setup_logger("benchmark_models", level="INFO")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--estimators",
+        help="JSON file with a list of {name, params} specs; names are aliases "
+        "(random_forest, extra_trees, sgd, svc, ...) or dotted class paths",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="Comma-separated square scene sizes in pixels",
+    )
+    parser.add_argument(
+        "--image",
+        action="append",
+        default=[],
+        help="Real multi-band raster to benchmark on (repeatable)",
+    )
+    parser.add_argument(
+        "--bands",
+        help="Comma-separated band names of --image; include green, red and NIR "
+        "(e.g. B03,B04,B08) for the index-based reference labels",
+    )
+    parser.add_argument(
+        "--no-synthetic", action="store_true", help="Only benchmark --image rasters"
+    )
+    parser.add_argument(
+        "--max-train-pixels", type=int, default=DEFAULT_MAX_TRAIN_PIXELS
+    )
+    parser.add_argument(
+        "--output", default="benchmark_report.json", help=".json or .csv"
+    )
+    args = parser.parse_args()
+
+    estimators = DEFAULT_ESTIMATORS
+    if args.estimators:
+        with open(args.estimators) as f:
+            estimators = json.load(f)
+    sources = ([] if args.no_synthetic else ["synthetic"]) + args.image
+
+    results = run_benchmarks(
+        estimators,
+        [int(size) for size in args.sizes.split(",")],
+        sources,
+        args.max_train_pixels,
+        args.bands.split(",") if args.bands else None,
+    )
+    write_report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
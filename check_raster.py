@@ -1,26 +1,39 @@
 #!/usr/bin/env python3
-"""Check Sentinel-2 or any raster image information."""
+"""Check Sentinel-2 or any raster image information as JSON lines."""
 
+import argparse
+import json
 import sys
 
 from src.sentinel2_classifier import setup_logger
-from src.sentinel2_classifier.raster_info import print_raster_info
+from src.sentinel2_classifier.raster_info import scan_rasters
 
 # Setup logging
 logger = setup_logger("check_raster", level="INFO")
 
 
 def main():
-    if len(sys.argv) != 2:
-        logger.error("Usage: python check_raster.py <image_path>")
-        sys.exit(1)
-
-    image_path = sys.argv[1]
-
-    try:
-        print_raster_info(image_path)
-    except Exception as e:
-        logger.error(f"Error reading raster: {e}")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="Raster files, glob patterns (quote them) or directories such as "
+        "SAFE products",
+    )
+    parser.add_argument(
+        "--index",
+        help="JSON catalog caching metadata by path and mtime between runs",
+    )
+    parser.add_argument("--workers", type=int, help="Threads opening rasters")
+    args = parser.parse_args()
+
+    records = scan_rasters(args.paths, args.workers, args.index)
+
+    # One JSON object per raster; unreadable files and paths or patterns
+    # without rasters carry an "error" field
+    for record in records:
+        print(json.dumps(record, allow_nan=False))
+    sys.exit(1 if any("error" in record for record in records) else 0)
 
 
 if __name__ == "__main__":
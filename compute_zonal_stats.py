@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Compute per-polygon class pixel counts and areas of a classified raster."""
+
+import argparse
+
+from src.sentinel2_classifier import setup_logger
+from src.sentinel2_classifier.zonal_stats import write_zonal_stats, zonal_class_stats
+
+# Setup logging
+logger = setup_logger("compute_zonal_stats", level="INFO")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("classified", help="Classified GeoTIFF")
+    parser.add_argument("geojson", help="GeoJSON FeatureCollection of zones")
+    parser.add_argument(
+        "--output", default="zonal_stats.csv", help=".csv or .json table"
+    )
+    parser.add_argument(
+        "--name-property", default="name", help="Feature property naming each zone"
+    )
+    parser.add_argument("--memory-budget-mb", type=float, default=256)
+    parser.add_argument(
+        "--all-touched",
+        action="store_true",
+        help="Count every pixel a polygon touches, not only those whose center is in it",
+    )
+    args = parser.parse_args()
+
+    rows = zonal_class_stats(
+        args.classified,
+        args.geojson,
+        args.memory_budget_mb,
+        args.all_touched,
+        args.name_property,
+    )
+    write_zonal_stats(rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Extract features and labels of many Sentinel-2 SAFE products into a feature store."""
+
+import json
+
+from src.sentinel2_classifier import (
+    build_feature_store,
+    create_sample_labels_from_index,
+    scan_safe_products,
+    setup_logger,
+)
+
+# Setup logging
+logger = setup_logger("extract_features", level="INFO")
+
+
+def load_config(config_path="config.json"):
+    """Load configuration from JSON file."""
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def main():
+    # Load configuration
+    config = load_config()
+    target_resolution = config["target_resolution"]
+    band_order = sorted(config["selected_bands"])
+    geojson_path = config.get("geojson_path")
+    # Either an explicit list of products or a directory holding *.SAFE folders
+    safe_folders = config.get("safe_folders")
+    if safe_folders is None and "safe_directory" in config:
+        safe_folders = [p.path for p in scan_safe_products(config["safe_directory"])]
+    if safe_folders is None:
+        safe_folders = [config["safe_folder"]]
+    store_path = config.get("feature_store", "feature_store")
+    indices = config.get("indices", ["ndvi", "ndwi"])
+    max_workers = config.get("max_workers")  # Decoding threads across all scenes
+
+    try:
+        keys = build_feature_store(
+            store_path,
+            safe_folders,
+            target_resolution,
+            band_order,
+            lambda data, valid_mask: create_sample_labels_from_index(
+                data, band_order, valid_mask
+            ),
+            geojson_path,
+            indices,
+            max_workers,
+        )
+        for key in keys:
+            logger.info(f"  {key}")
+        logger.info(f"Feature store: {store_path}")
+
+    except FileNotFoundError:
+        logger.error("Please provide valid Sentinel-2 SAFE folder paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,8 @@
 """Classify new Sentinel-2 images using trained model."""
 
 from src.sentinel2_classifier import setup_logger
-from src.sentinel2_classifier.classifier import Sentinel2Classifier
-from src.sentinel2_classifier.data_loader import load_sentinel2_image, prepare_features
-from src.sentinel2_classifier.raster_processor import (
-    save_classified_raster,
-    visualize_classification,
-)
+from src.sentinel2_classifier.parallel_inference import classify_raster_parallel
+from src.sentinel2_classifier.preview import render_preview
 
 # Setup logging
 logger = setup_logger("predict_image", level="INFO")
@@ -18,32 +14,29 @@ def main():
     model_path = "trained_model.pkl"
     input_image = "path/to/new_sentinel2_image.tif"  # Replace with actual path
     output_raster = "classified_output.tif"
+    memory_budget_mb = 256  # Peak working memory per worker process
+    n_workers = None  # Worker processes (default: one per CPU)
+    # Layout of the input bands, checked against the one recorded in .s2rf models
+    band_order = None  # e.g. ["B02", "B03", "B04", "B08"]
+    target_resolution = None  # e.g. 10
 
     try:
-        # Load trained model
-        classifier = Sentinel2Classifier()
-        classifier.load_model(model_path)
-        logger.info("Model loaded successfully")
-
-        # Load new image
-        data, profile = load_sentinel2_image(input_image)
-        logger.info(f"Processing image with shape: {data.shape}")
-
-        # Prepare features
-        features = prepare_features(data)
-
-        # Classify
+        # Classify window by window (read -> features -> predict -> write); each
+        # worker process loads the trained model once
         logger.info("Classifying image...")
-        predictions = classifier.predict(features)
-
-        # Save results
-        _, height, width = data.shape
-        save_classified_raster(predictions, profile, output_raster, height, width)
+        classify_raster_parallel(
+            model_path,
+            input_image,
+            output_raster,
+            n_workers,
+            memory_budget_mb,
+            band_order=band_order,
+            target_resolution=target_resolution,
+        )
         logger.info(f"Classification saved to {output_raster}")
 
-        # Visualize
-        classified_image = predictions.reshape(height, width)
-        visualize_classification(classified_image, "classification_map.png")
+        # Preview from the raster's overviews, without loading it in full
+        render_preview(output_raster, "classification_map.png")
 
     except FileNotFoundError as e:
         logger.error(f"File not found: {e}")
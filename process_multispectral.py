@@ -7,12 +7,13 @@ from sklearn.ensemble import RandomForestClassifier
 
 from src.sentinel2_classifier import (
     Sentinel2Classifier,
+    compute_valid_mask,
     create_sample_labels_from_index,
     load_sentinel2_multispectral,
     prepare_features,
+    render_preview,
     save_classified_raster,
     setup_logger,
-    visualize_classification,
 )
 
 # Setup logging
@@ -32,50 +33,67 @@ def main():
     geoJson = config["geojson_path"]
     target_resolution = config["target_resolution"]
     selected_bands = config["selected_bands"]
+    max_workers = config.get("max_workers")  # Band decoding threads
+    mask_scl = config.get("mask_scl", False)  # Skip SCL no-data/saturated pixels
+    max_samples_per_class = config.get("max_samples_per_class")  # Training sample cap
+    dedup = config.get("dedup", False)  # Predict each distinct spectrum once
 
     try:
         logger.info("Loading and resampling Sentinel-2 multispectral data...")
         data, profile, band_order = load_sentinel2_multispectral(
-            safe_folder, target_resolution, selected_bands, geoJson
+            safe_folder, target_resolution, selected_bands, geoJson, max_workers
         )
 
         logger.info(f"Resampled data shape: {data.shape}")
         logger.info(f"Band order: {band_order}")
         logger.info(f"Target resolution: {target_resolution}m")
 
+        # Skip nodata pixels and pixels outside the GeoJSON polygon
+        scl = None
+        if mask_scl:
+            scl, _, _ = load_sentinel2_multispectral(
+                safe_folder, target_resolution, ["SCL"], geoJson, max_workers
+            )
+            scl = scl[0]
+        valid_mask = compute_valid_mask(data, profile["nodata"], scl=scl)
+        logger.info(f"Valid pixels: {valid_mask.sum()} of {valid_mask.size}")
+
         # Prepare features for sklearn
-        features = prepare_features(data)
+        features = prepare_features(data, valid_mask=valid_mask)
         logger.info(f"Features shape: {features.shape}")
 
         # Generate labels from indices
-        labels = create_sample_labels_from_index(data, band_order)
+        labels = create_sample_labels_from_index(data, band_order, valid_mask)
         logger.info(f"Generated {len(np.unique(labels))} classes")
 
         # Train classifier
         classifier = Sentinel2Classifier(
-            RandomForestClassifier(n_estimators=100, random_state=42)
+            RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1),
+            dedup=dedup,
         )
 
         logger.info("Training model...")
-        classifier.train(features, labels)
+        classifier.train(features, labels, max_samples_per_class=max_samples_per_class)
 
         # Classify full image
         logger.info("Classifying image...")
-        predictions = classifier.predict(features)
+        predictions = classifier.predict(features, valid_mask)
 
         # Save results
         _, height, width = data.shape
-        classified_image = predictions.reshape(height, width)
 
         # Save model and results
         classifier.save_model("multispectral_model.pkl")
+        classifier.export_model(
+            "multispectral_model.s2rf", band_order, target_resolution
+        )
         save_classified_raster(
             predictions, profile, "multispectral_classified.tif", height, width
         )
-        visualize_classification(classified_image, "multispectral_map.png")
+        render_preview("multispectral_classified.tif", "multispectral_map.png")
 
         logger.info("Processing completed!")
-        logger.info("Model saved: multispectral_model.pkl")
+        logger.info("Model saved: multispectral_model.pkl, multispectral_model.s2rf")
         logger.info("Classified raster: multispectral_classified.tif")
         logger.info("Visualization: multispectral_map.png")
 
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Classify every feature of a GeoJSON FeatureCollection from one SAFE decode."""
+
+import json
+import os
+import re
+
+from src.sentinel2_classifier import (
+    Sentinel2Classifier,
+    compute_valid_mask,
+    load_sentinel2_rois,
+    prepare_features,
+    save_classified_raster,
+    setup_logger,
+)
+
+# Setup logging
+logger = setup_logger("process_rois", level="INFO")
+
+
+def load_config(config_path="config.json"):
+    """Load configuration from JSON file."""
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def roi_name(feature, position, name_property):
+    """Return a file-safe name for a feature: its *name_property* or position."""
+    name = (feature.get("properties") or {}).get(name_property)
+    if name is None:
+        return f"roi_{position}"
+    return re.sub(r"[^\w.-]+", "_", str(name)).strip("_") or f"roi_{position}"
+
+
+def main():
+    # Load configuration
+    config = load_config()
+    safe_folder = config["safe_folder"]
+    geojson_path = config["geojson_path"]
+    target_resolution = config["target_resolution"]
+    selected_bands = config["selected_bands"]
+    max_workers = config.get("max_workers")  # Band decoding threads
+    model_path = config.get("model_path", "multispectral_model.s2rf")
+    output_dir = config.get("roi_output_dir", "roi_outputs")
+    name_property = config.get("roi_name_property", "name")
+
+    try:
+        classifier = Sentinel2Classifier()
+        classifier.load_model(model_path)
+
+        # One decode of the union window, one cropped cube per feature
+        rois, band_order = load_sentinel2_rois(
+            safe_folder, geojson_path, target_resolution, selected_bands, max_workers
+        )
+        classifier.check_features(band_order, target_resolution)
+        os.makedirs(output_dir, exist_ok=True)
+
+        used_names = set()
+        for position, (feature, data, profile) in enumerate(rois):
+            name = roi_name(feature, position, name_property)
+            # Repeated names get the position appended so outputs don't overwrite
+            while name in used_names:
+                name = f"{name}_{position}"
+            used_names.add(name)
+            valid_mask = compute_valid_mask(data, profile["nodata"])
+            features = prepare_features(data, valid_mask=valid_mask)
+            predictions = classifier.predict(features, valid_mask)
+
+            output_path = os.path.join(output_dir, f"{name}_classified.tif")
+            _, height, width = data.shape
+            save_classified_raster(predictions, profile, output_path, height, width)
+            logger.info(f"{name}: {valid_mask.sum()} pixels -> {output_path}")
+
+        logger.info(f"Classified {len(rois)} ROIs into {output_dir}")
+
+    except FileNotFoundError:
+        logger.error("Please provide valid Sentinel-2 SAFE folder and model paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,80 @@
-"""Sentinel-2 Image Classification Demo Package."""
-
-import os
-
-from .classifier import Sentinel2Classifier
-from .data_loader import (
-    create_sample_labels,
-    create_sample_labels_from_index,
-    load_sentinel2_image,
-    load_sentinel2_multispectral,
-    prepare_features,
-)
-from .geospatial_utils import (
-    crop_multispectral_data,
-    get_roi_bounds,
-    load_geojson,
-    validate_and_transform_crs,
-)
-from .indices import calculate_indices_from_sentinel2, calculate_ndvi, calculate_ndwi
-from .logging_config import get_logger, setup_logger
-from .raster_info import get_raster_info, print_raster_info
-from .raster_processor import save_classified_raster, visualize_classification
-from .resampling import (
-    create_common_resolution_dataset,
-    load_sentinel2_safe_folder,
-    resample_sentinel2_bands,
-)
-
-# Setup default logger
-_log_level = os.getenv("SENTINEL2_LOG_LEVEL", "INFO")
-setup_logger(level=_log_level)
+"""Sentinel-2 Image Classification Demo Package.
+
+Public names are imported lazily on first access, so entry points only pay
+for the submodules (and scikit-learn, rasterio, ...) they actually use.
+"""
+
+import importlib
 
 __version__ = "0.1.0"
-__all__ = [
-    "load_sentinel2_image",
-    "load_sentinel2_multispectral",
-    "prepare_features",
-    "create_sample_labels",
-    "create_sample_labels_from_index",
-    "Sentinel2Classifier",
-    "save_classified_raster",
-    "visualize_classification",
-    "get_raster_info",
-    "print_raster_info",
-    "calculate_ndvi",
-    "calculate_ndwi",
-    "calculate_indices_from_sentinel2",
-    "resample_sentinel2_bands",
-    "load_sentinel2_safe_folder",
-    "create_common_resolution_dataset",
-    "load_geojson",
-    "validate_and_transform_crs",
-    "crop_multispectral_data",
-    "get_roi_bounds",
-    "get_logger",
-    "setup_logger",
-]
+
+# Public name -> submodule defining it
+_exports = {
+    "load_sentinel2_image": "data_loader",
+    "load_sentinel2_multispectral": "data_loader",
+    "load_sentinel2_rois": "data_loader",
+    "prepare_features": "data_loader",
+    "build_features": "features",
+    "iter_feature_chunks": "features",
+    "create_sample_labels": "data_loader",
+    "create_sample_labels_from_index": "data_loader",
+    "Sentinel2Classifier": "classifier",
+    "FlatForest": "forest_format",
+    "SpectralMemo": "dedup",
+    "ClassifiedRasterWriter": "raster_processor",
+    "save_classified_raster": "raster_processor",
+    "visualize_classification": "raster_processor",
+    "render_preview": "preview",
+    "get_raster_info": "raster_info",
+    "print_raster_info": "raster_info",
+    "find_rasters": "raster_info",
+    "scan_rasters": "raster_info",
+    "calculate_ndvi": "indices",
+    "calculate_ndwi": "indices",
+    "calculate_indices_from_sentinel2": "indices",
+    "compute_indices": "indices",
+    "resample_sentinel2_bands": "resampling",
+    "load_sentinel2_safe_folder": "resampling",
+    "resample_sentinel2_rois": "resampling",
+    "create_common_resolution_dataset": "resampling",
+    "classify_raster_windowed": "streaming",
+    "classify_raster_parallel": "parallel_inference",
+    "StratifiedSampler": "sampling",
+    "sample_training_pixels": "sampling",
+    "stratified_sample_indices": "sampling",
+    "IncrementalTrainer": "incremental",
+    "iter_scene_batches": "incremental",
+    "train_incremental": "incremental",
+    "FeatureStore": "feature_store",
+    "build_feature_store": "feature_store",
+    "SafeProduct": "safe_product",
+    "load_safe_product": "safe_product",
+    "scan_safe_products": "safe_product",
+    "load_geojson": "geospatial_utils",
+    "validate_and_transform_crs": "geospatial_utils",
+    "crop_multispectral_data": "geospatial_utils",
+    "get_roi_bounds": "geospatial_utils",
+    "zonal_class_stats": "zonal_stats",
+    "write_zonal_stats": "zonal_stats",
+    "RoiIndex": "geospatial_utils",
+    "BandCache": "band_cache",
+    "get_default_cache": "band_cache",
+    "CLASS_NODATA": "masking",
+    "compute_valid_mask": "masking",
+    "get_logger": "logging_config",
+    "setup_logger": "logging_config",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "sentinel2_classifier" / "bands"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+class BandCache:
+    """On-disk cache of decoded band arrays with size-bounded LRU eviction.
+
+    Entries are plain ``.npy`` files, so hits are memory-mapped rather than
+    read; the maps are copy-on-write, so callers may modify a hit in place
+    without changing the entry. The file modification time doubles as the last-access time used for
+    eviction.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source_path: str, **params) -> str:
+        """Build a cache key from the source file identity and read parameters."""
+        stat = os.stat(source_path)
+        identity = [
+            os.path.abspath(source_path),
+            stat.st_mtime_ns,
+            stat.st_size,
+            params,
+        ]
+        return hashlib.sha1(
+            json.dumps(identity, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached array as a writable copy-on-write map, or None on a miss."""
+        entry = self._entry_path(key)
+        try:
+            array = np.load(entry, mmap_mode="c")
+            os.utime(entry)  # Mark as recently used
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.debug(f"Band cache hit {key}")
+        return array
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        """Store *array* under *key* and evict old entries beyond the budget."""
+        if array.nbytes > self.max_bytes:
+            logger.debug(f"Not caching {key}: {array.nbytes} bytes exceeds budget")
+            return
+
+        # Write to a temporary file first so readers never see a partial entry
+        with tempfile.NamedTemporaryFile(
+            dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as tmp_file:
+            np.save(tmp_file, np.ascontiguousarray(array))
+        os.replace(tmp_file.name, self._entry_path(key))
+        logger.debug(f"Band cache stored {key} ({array.nbytes} bytes)")
+        self.evict()
+
+    def size_bytes(self) -> int:
+        """Return the total size of all cache entries."""
+        return sum(entry.stat().st_size for entry in self.cache_dir.glob("*.npy"))
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits the budget."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".npy"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.debug(f"Band cache evicted {path}")
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        for entry in self.cache_dir.glob("*.npy"):
+            entry.unlink(missing_ok=True)
+
+
+_default_cache = None
+
+
+def get_default_cache() -> Optional[BandCache]:
+    """Return the process-wide band cache configured from the environment.
+
+    Caching is on by default, in ``DEFAULT_CACHE_DIR`` with a budget of
+    ``DEFAULT_MAX_BYTES``. ``SENTINEL2_CACHE_DIR`` and
+    ``SENTINEL2_CACHE_MAX_BYTES`` override the location and byte budget; a
+    budget of 0 disables caching, as does a cache directory that cannot be
+    created.
+    """
+    global _default_cache
+    max_bytes = int(os.getenv("SENTINEL2_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    if max_bytes <= 0:
+        return None
+    if _default_cache is None:
+        cache_dir = os.getenv("SENTINEL2_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+        try:
+            _default_cache = BandCache(cache_dir, max_bytes)
+        except OSError as e:
+            logger.warning(f"Band cache disabled, cannot use {cache_dir}: {e}")
+            return None
+    return _default_cache
@@ -0,0 +1,233 @@
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from .classifier import Sentinel2Classifier
+from .data_loader import create_sample_labels_from_index, prepare_features
+from .logging_config import get_logger
+from .masking import compute_valid_mask
+from .sampling import stratified_sample_indices
+
+logger = get_logger(__name__)
+
+# Short names for the estimators we usually compare
+estimator_aliases = {
+    "random_forest": "sklearn.ensemble.RandomForestClassifier",
+    "extra_trees": "sklearn.ensemble.ExtraTreesClassifier",
+    "hist_gradient_boosting": "sklearn.ensemble.HistGradientBoostingClassifier",
+    "sgd": "sklearn.linear_model.SGDClassifier",
+    "gaussian_nb": "sklearn.naive_bayes.GaussianNB",
+    "svc": "sklearn.svm.SVC",
+}
+
+DEFAULT_ESTIMATORS = [
+    {"name": "random_forest", "params": {"n_estimators": 50, "random_state": 42}},
+    {"name": "extra_trees", "params": {"n_estimators": 50, "random_state": 42}},
+    {"name": "sgd", "params": {"random_state": 42}},
+    {"name": "gaussian_nb", "params": {}},
+]
+
+DEFAULT_SIZES = (256, 512, 1024)
+
+DEFAULT_MAX_TRAIN_PIXELS = 50_000
+
+# Band layout of synthetic cubes
+SYNTHETIC_BANDS = ["B02", "B03", "B04", "B08"]
+
+# Typical L2A reflectances (DN) of water, vegetation and built-up surfaces
+_SYNTHETIC_SPECTRA = np.array(
+    [
+        [900, 800, 500, 300],
+        [500, 800, 400, 3500],
+        [1400, 1500, 1600, 2000],
+    ]
+)
+
+
+def resolve_estimator(spec: dict):
+    """Build an estimator from ``{"name": alias or dotted class path, "params": {...}}``."""
+    path = estimator_aliases.get(spec["name"], spec["name"])
+    module_name, _, class_name = path.rpartition(".")
+    if not module_name:
+        raise ValueError(f"Unknown estimator {spec['name']!r}")
+    estimator_class = getattr(importlib.import_module(module_name), class_name)
+    return estimator_class(**spec.get("params", {}))
+
+
+def make_synthetic_cube(
+    height: int, width: int, seed: int = 0
+) -> Tuple[np.ndarray, List[str]]:
+    """Return a uint16 ``(bands, height, width)`` cube of blocky land-cover patches.
+
+    Patches of water, vegetation and built-up spectra with per-pixel noise, so
+    index-based labels form three spatially coherent classes.
+    """
+    rng = np.random.default_rng(seed)
+    patch = 32
+    cover = rng.integers(
+        0, len(_SYNTHETIC_SPECTRA), (-(-height // patch), -(-width // patch))
+    )
+    cover = np.repeat(np.repeat(cover, patch, axis=0), patch, axis=1)[:height, :width]
+    data = _SYNTHETIC_SPECTRA[cover].transpose(2, 0, 1).astype(np.float64)
+    data *= rng.normal(1.0, 0.15, data.shape)
+    return np.clip(data, 1, 10000).astype(np.uint16), list(SYNTHETIC_BANDS)
+
+
+def load_real_cube(
+    image_path: str, height: int, width: int, band_order: Optional[List[str]] = None
+) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """Read a centered *height* x *width* window of a multi-band raster."""
+    with rasterio.open(image_path) as src:
+        height, width = min(height, src.height), min(width, src.width)
+        window = Window(
+            (src.width - width) // 2, (src.height - height) // 2, width, height
+        )
+        return src.read(window=window), band_order
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: dict) -> dict:
+    """Train and evaluate one estimator on one cube; return the measurements.
+
+    Meant to run in a fresh process (see ``run_benchmarks``), so the peak RSS
+    covers this case only. ``baseline_rss_mb`` is the peak before the cube is
+    built, i.e. the interpreter and imports.
+    """
+    baseline_rss_mb = _peak_rss_mb()
+    size = case["size"]
+    if case["source"] == "synthetic":
+        data, band_order = make_synthetic_cube(size, size, case.get("seed", 0))
+    else:
+        data, band_order = load_real_cube(
+            case["source"], size, size, case.get("band_order")
+        )
+
+    valid_mask = compute_valid_mask(data)
+    features = prepare_features(data, valid_mask=valid_mask)
+    labels = create_sample_labels_from_index(data, band_order, valid_mask)
+
+    # Balanced training sample; every valid pixel is predicted and scored
+    n_classes = len(np.unique(labels))
+    sample = stratified_sample_indices(
+        labels, max(1, case["max_train_pixels"] // max(1, n_classes))
+    )
+    classifier = Sentinel2Classifier(resolve_estimator(case["estimator"]))
+
+    start = time.perf_counter()
+    classifier.train(features[sample], labels[sample])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = classifier.predict(features)
+    predict_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        classifier.save_model(model_path)
+        model_bytes = os.path.getsize(model_path)
+
+    return {
+        "estimator": case["estimator"]["name"],
+        "params": json.dumps(case["estimator"].get("params", {}), sort_keys=True),
+        "source": case["source"],
+        "size": f"{data.shape[1]}x{data.shape[2]}",
+        "bands": data.shape[0],
+        "pixels": int(features.shape[0]),
+        "train_pixels": int(sample.shape[0]),
+        "fit_seconds": round(fit_seconds, 4),
+        "predict_seconds": round(predict_seconds, 4),
+        "predict_pixels_per_second": round(features.shape[0] / predict_seconds),
+        "accuracy": round(float(np.mean(predictions == labels)), 4),
+        "model_bytes": model_bytes,
+        "baseline_rss_mb": round(baseline_rss_mb, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmarks(
+    estimators: Sequence[dict] = DEFAULT_ESTIMATORS,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    sources: Sequence[str] = ("synthetic",),
+    max_train_pixels: int = DEFAULT_MAX_TRAIN_PIXELS,
+    band_order: Optional[List[str]] = None,
+    isolate: bool = True,
+) -> List[dict]:
+    """Run every estimator on every source (``"synthetic"`` or a raster path) and size.
+
+    With *isolate*, each case runs in its own spawned process so that peak
+    RSS is measured per case. A failing case is logged and reported with its
+    error instead of aborting the run.
+    """
+    results = []
+    for source in sources:
+        for size in sizes:
+            for estimator in estimators:
+                case = {
+                    "estimator": estimator,
+                    "source": source,
+                    "size": size,
+                    "band_order": band_order,
+                    "max_train_pixels": max_train_pixels,
+                }
+                logger.info(f"Benchmarking {estimator['name']} on {source} {size}px")
+                try:
+                    if isolate:
+                        with ProcessPoolExecutor(
+                            max_workers=1,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        ) as executor:
+                            result = executor.submit(run_case, case).result()
+                    else:
+                        result = run_case(case)
+                except Exception as e:
+                    logger.error(
+                        f"{estimator['name']} on {source} {size}px failed: {e}"
+                    )
+                    result = {
+                        "estimator": estimator["name"],
+                        "source": source,
+                        "size": size,
+                        "error": str(e),
+                    }
+                else:
+                    logger.info(
+                        f"{result['estimator']}: fit {result['fit_seconds']}s, "
+                        f"{result['predict_pixels_per_second']} pixels/s, "
+                        f"peak {result['peak_rss_mb']} MB, "
+                        f"model {result['model_bytes']} bytes"
+                    )
+                results.append(result)
+    return results
+
+
+def write_report(results: Sequence[dict], path: str) -> None:
+    """Write results as CSV when *path* ends in ``.csv``, JSON otherwise."""
+    if path.endswith(".csv"):
+        fields = []
+        for result in results:
+            fields += [key for key in result if key not in fields]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(path, "w") as f:
+            json.dump(list(results), f, indent=2)
+    logger.info(f"Benchmark report saved to {path}")
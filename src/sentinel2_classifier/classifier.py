@@ -1,40 +1,256 @@
 import pickle
+from typing import TYPE_CHECKING, Iterator, Tuple
 
 import numpy as np
-from sklearn.base import BaseEstimator
-from sklearn.ensemble import RandomForestClassifier
 
+from .dedup import DEFAULT_MEMO_ENTRIES, SpectralMemo
+from .forest_format import FlatForest, check_feature_layout, is_forest_file
 from .logging_config import get_logger
+from .masking import CLASS_NODATA, label_dtype
+from .sampling import stratified_sample_indices
+
+if TYPE_CHECKING:
+    from sklearn.base import BaseEstimator
 
 logger = get_logger(__name__)
 
+# Default working memory for one chunk of predict / predict_proba
+DEFAULT_PREDICT_MEMORY_MB = 64
+
+
+def _check_out(out: np.ndarray, shape: tuple, dtype) -> np.ndarray:
+    """Return *out*, or a new array, after checking it can hold the result."""
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError(f"out must have shape {shape}, got {out.shape}")
+    return out
+
 
 class Sentinel2Classifier:
     """Wrapper for sklearn classifiers with easy model switching."""
 
-    def __init__(self, classifier: BaseEstimator = None):
-        self.classifier = (
-            classifier
-            if classifier is not None
-            else RandomForestClassifier(n_estimators=50, random_state=42)
-        )
+    def __init__(
+        self,
+        classifier: "BaseEstimator" = None,
+        dedup: bool = False,
+        memo_entries: int = DEFAULT_MEMO_ENTRIES,
+    ):
+        if classifier is None:
+            # Imported here so importing the package never loads sklearn
+            from sklearn.ensemble import RandomForestClassifier
+
+            classifier = RandomForestClassifier(
+                n_estimators=50, random_state=42, n_jobs=-1
+            )
+        self.classifier = classifier
+        # With dedup, predict evaluates each distinct spectrum once and keeps a
+        # spectrum -> class memo of *memo_entries* across calls
+        self.memo = SpectralMemo(memo_entries) if dedup else None
+        # Estimator the memo entries came from; they are dropped when it changes
+        self._memo_model = None
 
-    def train(self, features: np.ndarray, labels: np.ndarray) -> None:
-        """Train the classifier."""
+    def train(
+        self,
+        features: np.ndarray,
+        labels: np.ndarray,
+        valid_mask: np.ndarray = None,
+        max_samples_per_class: int = None,
+        random_state: int = 42,
+    ) -> None:
+        """Train the classifier.
+
+        With *valid_mask*, only valid pixels are used; *features* and *labels*
+        may hold either every pixel or only the valid ones. With
+        *max_samples_per_class*, training uses a reproducible class-balanced
+        sample of at most that many pixels per class.
+        """
+        if valid_mask is not None:
+            flat_mask = valid_mask.ravel()
+            if features.shape[0] == flat_mask.size:
+                features = features[flat_mask]
+            if labels.shape[0] == flat_mask.size:
+                labels = labels[flat_mask]
+        if max_samples_per_class is not None:
+            sample = stratified_sample_indices(
+                labels, max_samples_per_class, random_state
+            )
+            features, labels = features[sample], labels[sample]
         logger.info(
             f"Training classifier with {features.shape[0]} samples and {features.shape[1]} features"
         )
         self.classifier.fit(features, labels)
+        self._reset_memo()
         logger.info("Training completed")
 
-    def predict(self, features: np.ndarray) -> np.ndarray:
-        """Predict labels for new features."""
-        logger.info(f"Predicting labels for {features.shape[0]} samples")
-        predictions = self.classifier.predict(features)
-        logger.debug(
-            f"Prediction completed with {len(np.unique(predictions))} unique classes"
-        )
-        return predictions
+    def _reset_memo(self) -> None:
+        """Drop memoized labels, which belong to the previous model."""
+        if self.memo is not None:
+            self.memo.clear()
+        self._memo_model = None
+
+    def _plan_chunk_rows(
+        self, n_features: int, chunk_rows: int = None, memory_budget_mb: float = None
+    ) -> int:
+        """Return how many rows to predict per call to the estimator."""
+        if chunk_rows:
+            return chunk_rows
+        if memory_budget_mb is None:
+            memory_budget_mb = DEFAULT_PREDICT_MEMORY_MB
+        n_classes = len(getattr(self.classifier, "classes_", ())) or 1
+        # Float32 copy of the features, float64 probabilities (accumulator plus
+        # one per-tree temporary) and the labels
+        bytes_per_row = n_features * 4 + 2 * n_classes * 8 + 8
+        return max(1, int(memory_budget_mb * 1024 * 1024) // bytes_per_row)
+
+    def _iter_chunks(
+        self,
+        features: np.ndarray,
+        valid_mask: np.ndarray = None,
+        chunk_rows: int = None,
+        memory_budget_mb: float = None,
+    ) -> Iterator[Tuple[slice, np.ndarray, np.ndarray]]:
+        """Yield ``(output_rows, chunk_mask, chunk_features)`` for chunked prediction.
+
+        Without *valid_mask*, ``chunk_mask`` is None and every row is predicted.
+        With it, ``chunk_features`` holds only the valid rows of ``output_rows``,
+        whether *features* covers every pixel or only the valid ones.
+        """
+        rows = self._plan_chunk_rows(features.shape[1], chunk_rows, memory_budget_mb)
+        if valid_mask is None:
+            for start in range(0, features.shape[0], rows):
+                yield slice(start, start + rows), None, features[start : start + rows]
+            return
+
+        flat_mask = valid_mask.ravel()
+        compact = features.shape[0] != flat_mask.size
+        offset = 0
+        for start in range(0, flat_mask.size, rows):
+            output_rows = slice(start, start + rows)
+            chunk_mask = flat_mask[output_rows]
+            if compact:
+                n_valid = int(np.count_nonzero(chunk_mask))
+                chunk_features = features[offset : offset + n_valid]
+                offset += n_valid
+            else:
+                chunk_features = features[output_rows][chunk_mask]
+            yield output_rows, chunk_mask, chunk_features
+
+    def predict(
+        self,
+        features: np.ndarray,
+        valid_mask: np.ndarray = None,
+        nodata: int = CLASS_NODATA,
+        chunk_rows: int = None,
+        memory_budget_mb: float = None,
+        out: np.ndarray = None,
+    ) -> np.ndarray:
+        """Predict labels for new features.
+
+        With *valid_mask*, only valid pixels are predicted and the result covers
+        every pixel, with *nodata* where the mask is False. *features* may hold
+        either every pixel or only the valid ones.
+
+        Rows are predicted *chunk_rows* at a time, by default as many as fit in
+        *memory_budget_mb* of temporaries. Labels are written into *out* when
+        given, so a buffer can be reused across tiles. Otherwise the output
+        dtype follows ``classes_`` (or the first predictions when the estimator
+        has none), widened to fit *nodata*; non-numeric classes such as strings
+        give an object array.
+        """
+        n_rows = valid_mask.size if valid_mask is not None else features.shape[0]
+        classes = getattr(self.classifier, "classes_", None)
+        if out is not None:
+            out = _check_out(out, (n_rows,), out.dtype)
+        elif classes is not None:
+            dtype = np.asarray(classes).dtype
+            if valid_mask is not None:
+                dtype = label_dtype(dtype, nodata)
+            out = np.empty(n_rows, dtype=dtype)
+
+        logger.info(f"Predicting labels for {n_rows} samples")
+        # Fully masked chunks seen before *out* exists; filled once it does
+        pending_rows = []
+        for output_rows, chunk_mask, chunk_features in self._iter_chunks(
+            features, valid_mask, chunk_rows, memory_budget_mb
+        ):
+            if chunk_features.shape[0] == 0:
+                if out is None:
+                    pending_rows.append(output_rows)
+                    continue
+                predictions = np.empty(0, dtype=out.dtype)
+            elif self.memo is not None:
+                if self._memo_model is not self.classifier:
+                    # The estimator was reassigned since the memo was filled
+                    self.memo.clear()
+                    self._memo_model = self.classifier
+                predictions = self.memo.predict(self.classifier.predict, chunk_features)
+            else:
+                predictions = self.classifier.predict(chunk_features)
+            if out is None:
+                dtype = predictions.dtype
+                if valid_mask is not None:
+                    dtype = label_dtype(dtype, nodata)
+                out = np.empty(n_rows, dtype=dtype)
+                for rows in pending_rows:
+                    out[rows] = nodata
+            if chunk_mask is None:
+                out[output_rows] = predictions
+            else:
+                chunk_out = out[output_rows]
+                chunk_out[chunk_mask] = predictions
+                chunk_out[~chunk_mask] = nodata
+        if out is None:
+            # Nothing was predicted: every pixel is nodata
+            out = np.full(n_rows, nodata, dtype=np.min_scalar_type(nodata))
+        if self.memo is not None:
+            logger.debug(f"Deduplicated prediction: {self.memo.report()}")
+        logger.debug("Prediction completed")
+        return out
+
+    def predict_proba(
+        self,
+        features: np.ndarray,
+        valid_mask: np.ndarray = None,
+        chunk_rows: int = None,
+        memory_budget_mb: float = None,
+        out: np.ndarray = None,
+        dtype=np.float64,
+    ) -> np.ndarray:
+        """Predict class probabilities, one column per class in ``classes_`` order.
+
+        Chunking, *valid_mask* and *out* work as in ``predict``; masked pixels
+        get all-zero probabilities. An integer *dtype* (or *out* dtype) such as
+        uint8 returns confidences scaled to ``0..max`` of that type, e.g. a
+        0-255 confidence map.
+        """
+        n_rows = valid_mask.size if valid_mask is not None else features.shape[0]
+        n_classes = len(self.classifier.classes_)
+        if out is not None:
+            dtype = out.dtype
+        out = _check_out(out, (n_rows, n_classes), dtype)
+        scale = None
+        if np.issubdtype(out.dtype, np.integer):
+            scale = np.iinfo(out.dtype).max
+
+        logger.info(f"Predicting class probabilities for {n_rows} samples")
+        for output_rows, chunk_mask, chunk_features in self._iter_chunks(
+            features, valid_mask, chunk_rows, memory_budget_mb
+        ):
+            if chunk_features.shape[0] == 0:
+                proba = np.empty((0, n_classes))
+            else:
+                proba = self.classifier.predict_proba(chunk_features)
+            if scale is not None:
+                proba *= scale
+                np.rint(proba, out=proba)
+            if chunk_mask is None:
+                out[output_rows] = proba
+            else:
+                chunk_out = out[output_rows]
+                chunk_out[chunk_mask] = proba
+                chunk_out[~chunk_mask] = 0
+        return out
 
     def save_model(self, filepath: str) -> None:
         """Save trained model to pickle file."""
@@ -43,9 +259,52 @@ class Sentinel2Classifier:
             pickle.dump(self.classifier, f)
         logger.info("Model saved successfully")
 
+    def export_model(
+        self,
+        filepath: str,
+        band_order: list = None,
+        target_resolution: int = None,
+        indices: list = None,
+    ) -> None:
+        """Save a trained forest in the compact, memory-mappable forest format.
+
+        The feature layout (band order, resolution, indices) is recorded so the
+        model cannot silently be applied to differently ordered features.
+        """
+        logger.info(f"Exporting model to {filepath}")
+        forest = self.classifier
+        if not isinstance(forest, FlatForest):
+            forest = FlatForest.from_sklearn(
+                forest, band_order, target_resolution, indices
+            )
+        forest.save(filepath)
+        logger.info("Model exported successfully")
+
     def load_model(self, filepath: str) -> None:
-        """Load trained model from pickle file."""
+        """Load trained model from a pickle or compact forest file.
+
+        Forest files are rebuilt as a scikit-learn forest (see
+        ``FlatForest.to_sklearn``).
+        """
         logger.info(f"Loading model from {filepath}")
-        with open(filepath, "rb") as f:
-            self.classifier = pickle.load(f)
+        if is_forest_file(filepath):
+            self.classifier = FlatForest.load(filepath, mmap=False).to_sklearn()
+        else:
+            with open(filepath, "rb") as f:
+                self.classifier = pickle.load(f)
+        self._reset_memo()
         logger.info("Model loaded successfully")
+
+    def check_features(
+        self,
+        band_order: list = None,
+        target_resolution: int = None,
+        indices: list = None,
+    ) -> None:
+        """Raise ValueError if a loaded forest was trained on another feature layout."""
+        if isinstance(self.classifier, FlatForest):
+            metadata = self.classifier.metadata
+        else:
+            metadata = getattr(self.classifier, "forest_metadata_", None)
+        if metadata is not None:
+            check_feature_layout(metadata, band_order, target_resolution, indices)
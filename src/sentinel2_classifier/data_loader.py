@@ -1,20 +1,42 @@
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 import rasterio
 
+from .band_cache import BandCache, get_default_cache
+from .features import build_features
 from .indices import calculate_indices_from_sentinel2
 from .logging_config import get_logger
-from .resampling import create_common_resolution_dataset, load_sentinel2_safe_folder
+from .resampling import (
+    get_bands_for_resolution,
+    load_sentinel2_safe_folder,
+    load_sentinel2_safe_folder_rois,
+)
+from .safe_product import load_safe_product
 
 logger = get_logger(__name__)
 
 
-def load_sentinel2_image(image_path: str) -> Tuple[np.ndarray, dict]:
-    """Load Sentinel-2 image and return data array with metadata."""
+def load_sentinel2_image(
+    image_path: str, cache: Optional[BandCache] = None
+) -> Tuple[np.ndarray, dict]:
+    """Load Sentinel-2 image and return data array with metadata.
+
+    Decoded pixels are served from *cache* (default: the band cache from
+    ``get_default_cache``) when available. The returned array is writable either way; a cache hit is a
+    copy-on-write memory map, so in-place edits never reach the cache.
+    """
+    if cache is None:
+        cache = get_default_cache()
+
     with rasterio.open(image_path) as src:
-        data = src.read()
         profile = src.profile
+        key = cache.make_key(image_path, window=None) if cache is not None else None
+        data = cache.get(key) if cache is not None else None
+        if data is None:
+            data = src.read()
+            if cache is not None:
+                cache.put(key, data)
     return data, profile
 
 
@@ -23,58 +45,81 @@ def load_sentinel2_multispectral(
     target_resolution: int = 10,
     selected_bands: list = None,
     geojson_path: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
 ) -> Tuple[np.ndarray, dict, list]:
     """Load and resample Sentinel-2 SAFE folder to common resolution, optionally crop with GeoJSON."""
-    # Define bands available at each resolution
-    resolution_bands = {
-        10: ["AOT", "B02", "B03", "B04", "B08", "TCI", "WVP"],
-        20: [
-            "AOT",
-            "B01",
-            "B02",
-            "B03",
-            "B04",
-            "B05",
-            "B06",
-            "B07",
-            "B11",
-            "B12",
-            "B8A",
-            "SCL",
-            "TCI",
-            "WVP",
-        ],
-        60: [
-            "AOT",
-            "B01",
-            "B02",
-            "B03",
-            "B04",
-            "B05",
-            "B06",
-            "B07",
-            "B09",
-            "B11",
-            "B12",
-            "B8A",
-            "SCL",
-            "TCI",
-            "WVP",
-        ],
-    }
-
     if selected_bands is None:
-        selected_bands = resolution_bands[target_resolution]
+        selected_bands = get_bands_for_resolution(target_resolution)
 
     data, profile = load_sentinel2_safe_folder(
-        safe_folder, target_resolution, selected_bands, geojson_path
+        safe_folder,
+        target_resolution,
+        selected_bands,
+        geojson_path,
+        max_workers,
+        upsampling,
+        cache,
+    )
+    # Bands are stacked in sorted order and missing bands are skipped
+    band_order = sorted(
+        load_safe_product(safe_folder).get_band_paths(selected_bands, target_resolution)
+    )
+    return data, profile, band_order
+
+
+def load_sentinel2_rois(
+    safe_folder: str,
+    geojson_path: str,
+    target_resolution: int = 10,
+    selected_bands: list = None,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
+) -> Tuple[List[Tuple[dict, np.ndarray, dict]], list]:
+    """Load a cropped cube per GeoJSON feature, decoding the SAFE folder once.
+
+    Returns ``([(feature, data, profile), ...], band_order)``; see
+    ``resample_sentinel2_rois``.
+    """
+    if selected_bands is None:
+        selected_bands = get_bands_for_resolution(target_resolution)
+
+    rois = load_sentinel2_safe_folder_rois(
+        safe_folder,
+        geojson_path,
+        target_resolution,
+        selected_bands,
+        max_workers,
+        upsampling,
+        cache,
     )
-    return data, profile, selected_bands
+    band_order = sorted(
+        load_safe_product(safe_folder).get_band_paths(selected_bands, target_resolution)
+    )
+    return rois, band_order
 
 
-def prepare_features(data: np.ndarray) -> np.ndarray:
-    """Reshape image data for sklearn (pixels x bands)."""
-    return create_common_resolution_dataset(data)
+def prepare_features(
+    data: np.ndarray,
+    dtype=np.float32,
+    band_order: list = None,
+    indices: Sequence[str] = (),
+    valid_mask: np.ndarray = None,
+) -> np.ndarray:
+    """Reshape image data for sklearn (pixels x bands, C-contiguous float32).
+
+    Spectral *indices* (see ``compute_indices``) are appended as extra columns.
+    With *valid_mask*, only the valid pixels are featurized.
+    """
+    return build_features(
+        data,
+        dtype=dtype,
+        band_order=band_order,
+        indices=indices,
+        valid_mask=valid_mask,
+    )
 
 
 def create_sample_labels(height: int, width: int) -> np.ndarray:
@@ -88,9 +133,9 @@ def create_sample_labels(height: int, width: int) -> np.ndarray:
 
 
 def create_sample_labels_from_index(
-    data: np.ndarray, band_order: list = None
+    data: np.ndarray, band_order: list = None, valid_mask: np.ndarray = None
 ) -> np.ndarray:
-    """Create labels based on NDVI and NDWI indices."""
+    """Create labels based on NDVI and NDWI indices (valid pixels only if masked)."""
     ndvi, ndwi = calculate_indices_from_sentinel2(data, band_order)
 
     labels = np.zeros_like(ndvi, dtype=np.uint8)
@@ -104,4 +149,6 @@ def create_sample_labels_from_index(
     # Urban: low NDVI and low NDWI
     labels[(ndvi <= 0.4) & (ndwi <= 0.3)] = 2
 
+    if valid_mask is not None:
+        return labels.ravel()[valid_mask.ravel()]
     return labels.flatten()
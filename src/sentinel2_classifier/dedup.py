@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+import numpy as np
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MEMO_ENTRIES = 100_000
+
+
+def _row_view(features: np.ndarray) -> np.ndarray:
+    """View each row of a C-contiguous 2-D array as one opaque byte string."""
+    return features.view(
+        np.dtype((np.void, features.dtype.itemsize * features.shape[1]))
+    )
+
+
+def unique_rows(features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(unique, inverse)`` so that ``unique[inverse]`` equals *features*.
+
+    Rows are compared by their raw bytes, which is exact for integer features
+    and for float features without NaNs.
+    """
+    features = np.ascontiguousarray(features)
+    unique, inverse = np.unique(_row_view(features).ravel(), return_inverse=True)
+    return unique.view(features.dtype).reshape(-1, features.shape[1]), inverse
+
+
+class SpectralMemo:
+    """Predict each distinct spectral vector once, remembering recent results.
+
+    Every batch is reduced to its unique feature rows. Rows already in the
+    memo reuse their class; only the rest are predicted, and the
+    *max_entries* most recently used spectrum -> class pairs are kept across
+    batches (0 disables the memo and only deduplicates within a batch).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_ENTRIES):
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._layout = None
+        self.pixels = 0
+        self.unique = 0
+        self.hits = 0
+        self.evaluated = 0
+
+    def clear(self) -> None:
+        """Forget every remembered spectrum, e.g. after the model changed."""
+        self._memo.clear()
+        self._layout = None
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of pixels that did not need a model evaluation."""
+        return 1.0 - self.evaluated / self.pixels if self.pixels else 0.0
+
+    def predict(
+        self, predict_fn: Callable[[np.ndarray], np.ndarray], features: np.ndarray
+    ) -> np.ndarray:
+        """Return ``predict_fn(features)``, evaluating only unseen spectra."""
+        if features.shape[0] == 0:
+            return predict_fn(features)
+
+        # Cached byte keys are only meaningful for one dtype and width
+        layout = (features.dtype.str, features.shape[1])
+        if layout != self._layout:
+            self._memo.clear()
+            self._layout = layout
+
+        unique, inverse = unique_rows(features)
+        keys = _row_view(unique).ravel().tolist()
+        labels = [self._memo.get(key) for key in keys]
+        missing = [i for i, label in enumerate(labels) if label is None]
+
+        if missing:
+            predicted = predict_fn(unique[missing])
+            for i, label in zip(missing, predicted):
+                labels[i] = label
+        unique_labels = np.asarray(labels)
+
+        if self.max_entries:
+            for key, label in zip(keys, labels):
+                self._memo[key] = label
+                self._memo.move_to_end(key)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+
+        self.pixels += features.shape[0]
+        self.unique += unique.shape[0]
+        self.hits += unique.shape[0] - len(missing)
+        self.evaluated += len(missing)
+        logger.debug(
+            f"{features.shape[0]} pixels, {unique.shape[0]} unique, "
+            f"{len(missing)} evaluated"
+        )
+        return unique_labels[inverse]
+
+    def report(self) -> str:
+        """Summarize how much work deduplication and the memo saved."""
+        return (
+            f"{self.pixels} pixels, {self.unique} unique per batch, "
+            f"{self.hits} memo hits, {self.evaluated} evaluated "
+            f"(hit rate {self.hit_rate:.1%})"
+        )
@@ -0,0 +1,357 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .indices import compute_indices
+from .logging_config import get_logger
+from .masking import compute_valid_mask
+from .resampling import ResampledBandReader
+from .safe_product import load_safe_product
+from .streaming import DEFAULT_MEMORY_BUDGET_MB, iter_row_windows, plan_rows_per_window
+
+logger = get_logger(__name__)
+
+FEATURE_STORE_VERSION = 2
+
+# Rows per batch when reading entries back
+DEFAULT_CHUNK_PIXELS = 1 << 20
+
+
+class FeatureStore:
+    """On-disk, columnar store of per-pixel features keyed by scene, ROI and resolution.
+
+    Every entry is a directory with one ``.npy`` file per column (each band in
+    its source dtype, each spectral index as float32, optional labels and the
+    flat ``pixel_index`` of every valid pixel in the scene grid) and a
+    ``meta.json``. Columns are memory-mapped on read, so training runs never
+    decode the JP2s again.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(
+        safe_folder: str,
+        target_resolution: int,
+        band_order: Sequence[str],
+        geojson_path: Optional[str] = None,
+        indices: Sequence[str] = (),
+    ) -> str:
+        """Build the entry key from the scene identity, ROI, resolution and features."""
+        roi_digest = None
+        if geojson_path is not None:
+            with open(geojson_path, "rb") as f:
+                roi_digest = hashlib.sha1(f.read()).hexdigest()
+        identity = [
+            FEATURE_STORE_VERSION,
+            os.path.abspath(safe_folder),
+            os.stat(safe_folder).st_mtime_ns,
+            roi_digest,
+            target_resolution,
+            sorted(band_order),
+            list(indices),
+        ]
+        digest = hashlib.sha1(json.dumps(identity).encode()).hexdigest()[:16]
+        scene = os.path.basename(os.path.normpath(safe_folder)).removesuffix(".SAFE")
+        return f"{scene}_{target_resolution}m_{digest}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key
+
+    def __contains__(self, key: str) -> bool:
+        return (self._entry_path(key) / "meta.json").exists()
+
+    def keys(self) -> List[str]:
+        """Return the keys of all complete entries."""
+        return sorted(
+            entry.name
+            for entry in os.scandir(self.root)
+            if entry.is_dir() and entry.name in self
+        )
+
+    def metadata(self, key: str) -> dict:
+        """Return the ``meta.json`` of an entry.
+
+        Raise ValueError if the entry was written by another store version.
+        """
+        with open(self._entry_path(key) / "meta.json", "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != FEATURE_STORE_VERSION:
+            raise ValueError(
+                f"Feature store entry {key} has version {meta.get('version')}, "
+                f"expected {FEATURE_STORE_VERSION}; extract it again"
+            )
+        return meta
+
+    def open_columns(
+        self, key: str, columns: Optional[Sequence[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Memory-map the requested columns (default: all) of an entry read-only."""
+        entry = self._entry_path(key)
+        meta = self.metadata(key)
+        if columns is None:
+            columns = [column["name"] for column in meta["columns"]]
+        return {name: np.load(entry / f"{name}.npy", mmap_mode="r") for name in columns}
+
+    def feature_columns(self, key: str) -> List[str]:
+        """Return the band and index column names of an entry, in feature order."""
+        meta = self.metadata(key)
+        return meta["band_order"] + meta["indices"]
+
+    def load(
+        self,
+        key: str,
+        columns: Optional[Sequence[str]] = None,
+        rows: slice = slice(None),
+        dtype=np.float32,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Return ``(features, labels)`` for *rows* of an entry.
+
+        Features are a C-contiguous (pixels x columns) matrix of the requested
+        feature *columns* (default: every band then every index); labels are
+        None when the entry has none.
+        """
+        meta = self.metadata(key)
+        if columns is None:
+            columns = meta["band_order"] + meta["indices"]
+        mapped = self.open_columns(key, columns)
+        n_rows = len(range(*rows.indices(meta["n_pixels"])))
+        features = np.empty((n_rows, len(columns)), dtype=dtype)
+        for i, name in enumerate(columns):
+            features[:, i] = mapped[name][rows]
+
+        labels = None
+        if meta["has_labels"]:
+            labels = np.asarray(self.open_columns(key, ["labels"])["labels"][rows])
+        return features, labels
+
+    def iter_batches(
+        self,
+        keys: Sequence[str],
+        columns: Optional[Sequence[str]] = None,
+        batch_rows: int = DEFAULT_CHUNK_PIXELS,
+        dtype=np.float32,
+    ) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """Yield ``(features, labels)`` batches of at most *batch_rows* over entries."""
+        for key in keys:
+            n_pixels = self.metadata(key)["n_pixels"]
+            for start in range(0, n_pixels, batch_rows):
+                yield self.load(key, columns, slice(start, start + batch_rows), dtype)
+
+    def extract(
+        self,
+        safe_folder: str,
+        target_resolution: int,
+        band_order: Sequence[str],
+        label_fn: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+        geojson_path: Optional[str] = None,
+        indices: Sequence[str] = (),
+        max_workers: Optional[int] = None,
+        overwrite: bool = False,
+        memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    ) -> str:
+        """Decode one scene window by window and store its valid pixels; return the key.
+
+        Windows are sized so one stays within *memory_budget_mb* and their bands
+        are decoded by *max_workers* threads (default: one per band, capped at
+        the CPU count), so the scene is never held in memory at once.
+        ``label_fn(data, valid_mask)`` returns the labels of the valid pixels of
+        a window. An existing entry for the same key is reused unless
+        *overwrite*.
+        """
+        key = self.make_key(
+            safe_folder, target_resolution, band_order, geojson_path, indices
+        )
+        entry = self._entry_path(key)
+        if key in self and not overwrite:
+            logger.info(f"Feature store hit {key}")
+            return key
+
+        # Bands are stacked in sorted order and missing bands are skipped
+        band_paths = load_safe_product(safe_folder).get_band_paths(
+            list(band_order), target_resolution
+        )
+        band_order = sorted(band_paths)
+        reader = ResampledBandReader(
+            {band: band_paths[band] for band in band_order},
+            target_resolution,
+            geojson_path,
+        )
+        profile = reader.profile
+        height, width = profile["height"], profile["width"]
+        # Window, valid mask, pixel indices, column copies and index values
+        bytes_per_pixel = len(band_order) * reader.dtype.itemsize * 2 + (
+            1 + 8 + 8 + len(indices) * 4
+        )
+        rows_per_window = plan_rows_per_window(
+            height,
+            width,
+            bytes_per_pixel,
+            memory_budget_mb,
+            profile.get("blockysize", 1),
+        )
+        if max_workers is None:
+            max_workers = min(len(band_order), os.cpu_count() or 1)
+
+        # Write into a staging directory so readers never see a partial entry
+        staging = Path(tempfile.mkdtemp(dir=self.root, suffix=".tmp"))
+        columns = _ColumnSpool(staging)
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for window in iter_row_windows(height, width, rows_per_window):
+                    data = reader.read(window, executor)
+                    valid_mask = compute_valid_mask(data)
+                    rows, cols = np.nonzero(valid_mask)
+                    columns.append(
+                        "pixel_index", (rows + window.row_off) * width + cols
+                    )
+                    values = data[:, valid_mask]
+                    for band, band_values in zip(band_order, values):
+                        columns.append(band, band_values)
+                    if indices:
+                        index_values = compute_indices(values, band_order, indices)
+                        for name, index_row in zip(indices, index_values):
+                            columns.append(name, index_row)
+                    if label_fn is not None:
+                        labels = np.asarray(label_fn(data, valid_mask))
+                        if labels.shape != (values.shape[1],):
+                            raise ValueError(
+                                f"label_fn returned {labels.shape[0]} labels for "
+                                f"{values.shape[1]} valid pixels"
+                            )
+                        columns.append("labels", labels)
+            n_pixels = columns.finish()
+
+            meta = {
+                "version": FEATURE_STORE_VERSION,
+                "safe_folder": os.path.abspath(safe_folder),
+                "geojson_path": geojson_path,
+                "target_resolution": target_resolution,
+                "band_order": list(band_order),
+                "indices": list(indices),
+                "has_labels": label_fn is not None,
+                "n_pixels": int(n_pixels),
+                "height": int(height),
+                "width": int(width),
+                "crs": str(profile["crs"]),
+                "transform": list(profile["transform"])[:6],
+                "columns": [
+                    {"name": path.stem, "dtype": np.load(path, mmap_mode="r").dtype.str}
+                    for path in sorted(staging.glob("*.npy"))
+                ],
+            }
+            with open(staging / "meta.json", "w") as f:
+                json.dump(meta, f, indent=2)
+
+            if entry.exists():
+                shutil.rmtree(entry)
+            os.replace(staging, entry)
+        except BaseException:
+            columns.close()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logger.info(
+            f"Stored {n_pixels} pixels of {os.path.basename(safe_folder)} as {key}"
+        )
+        return key
+
+
+class _ColumnSpool:
+    """Append-only column files, written out as ``.npy`` once their length is known."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._files = {}
+        self._dtypes = {}
+
+    def append(self, name: str, values: np.ndarray) -> None:
+        """Append *values* to column *name*, in the dtype of its first values."""
+        if name not in self._files:
+            self._files[name] = open(self.directory / f"{name}.bin", "wb")
+            self._dtypes[name] = values.dtype
+        np.ascontiguousarray(values, dtype=self._dtypes[name]).tofile(self._files[name])
+
+    def finish(self) -> int:
+        """Turn every column into a ``.npy`` file; return the common row count."""
+        self.close()
+        lengths = set()
+        for name, dtype in self._dtypes.items():
+            raw_path = self.directory / f"{name}.bin"
+            length = raw_path.stat().st_size // dtype.itemsize
+            lengths.add(length)
+            with open(self.directory / f"{name}.npy", "wb") as out:
+                np.lib.format.write_array_header_1_0(
+                    out,
+                    {
+                        "descr": np.lib.format.dtype_to_descr(dtype),
+                        "fortran_order": False,
+                        "shape": (length,),
+                    },
+                )
+                with open(raw_path, "rb") as raw:
+                    shutil.copyfileobj(raw, out)
+            raw_path.unlink()
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        return lengths.pop() if lengths else 0
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+def build_feature_store(
+    root: str,
+    safe_folders: Sequence[str],
+    target_resolution: int,
+    band_order: Sequence[str],
+    label_fn: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+    geojson_path: Optional[str] = None,
+    indices: Sequence[str] = (),
+    max_workers: Optional[int] = None,
+    overwrite: bool = False,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+) -> List[str]:
+    """Extract many scenes into the store at *root* in parallel; return their keys.
+
+    Scenes run on a thread pool (decoding and NumPy release the GIL), so
+    *label_fn* need not be picklable. *max_workers* (default: the CPU count)
+    bounds the decoding threads of all scenes together, and
+    *memory_budget_mb* applies per scene. Scenes already in the store are
+    skipped.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    n_scenes = min(max_workers, len(safe_folders)) or 1
+    # Split the threads between scenes instead of a full pool per scene
+    scene_workers = max(1, max_workers // n_scenes)
+
+    store = FeatureStore(root)
+    with ThreadPoolExecutor(max_workers=n_scenes) as executor:
+        futures = [
+            executor.submit(
+                store.extract,
+                safe_folder,
+                target_resolution,
+                band_order,
+                label_fn,
+                geojson_path,
+                indices,
+                scene_workers,
+                overwrite,
+                memory_budget_mb,
+            )
+            for safe_folder in safe_folders
+        ]
+        keys = [future.result() for future in futures]
+    logger.info(f"Feature store {root} holds {len(keys)} requested scenes")
+    return keys
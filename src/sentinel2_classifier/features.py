@@ -0,0 +1,89 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .indices import compute_indices
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_FEATURE_BYTES = 256 * 1024**2
+
+
+def build_features(
+    data: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    dtype=np.float32,
+    band_order: Optional[List[str]] = None,
+    indices: Sequence[str] = (),
+    pixel_slice: slice = slice(None),
+    valid_mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Write a pixel-major, C-contiguous (pixels x features) matrix.
+
+    Features are the bands of *data* ``(bands, ...)`` followed by the requested
+    spectral *indices*. Only the pixels in *pixel_slice* (of the flattened
+    image) that are True in *valid_mask* are featurized. The result is written
+    into *out* when given, so sklearn can use it without another copy.
+    """
+    if indices and not np.issubdtype(np.dtype(dtype), np.floating):
+        raise ValueError("Spectral index features need a floating-point dtype")
+
+    n_bands = data.shape[0]
+    bands = data.reshape(n_bands, -1)[:, pixel_slice]
+    if valid_mask is not None:
+        bands = bands[:, valid_mask.ravel()[pixel_slice]]
+    n_pixels = bands.shape[1]
+    n_features = n_bands + len(indices)
+
+    if out is None:
+        out = np.empty((n_pixels, n_features), dtype=dtype)
+    elif out.shape != (n_pixels, n_features) or not out.flags.c_contiguous:
+        raise ValueError(
+            f"out must be C-contiguous with shape {(n_pixels, n_features)}, "
+            f"got {out.shape}"
+        )
+
+    out[:, :n_bands] = bands.T
+    if indices:
+        out[:, n_bands:] = compute_indices(bands, band_order, indices).T
+    return out
+
+
+def iter_feature_chunks(
+    data: np.ndarray,
+    max_bytes: int = DEFAULT_MAX_FEATURE_BYTES,
+    dtype=np.float32,
+    band_order: Optional[List[str]] = None,
+    indices: Sequence[str] = (),
+    valid_mask: Optional[np.ndarray] = None,
+) -> Iterator[Tuple[slice, np.ndarray]]:
+    """Yield ``(pixel_slice, features)`` chunks of at most *max_bytes* each.
+
+    With *valid_mask*, each chunk only holds the valid pixels of its slice.
+    The same buffer is reused for every chunk; copy it to keep it.
+    """
+    n_pixels = int(np.prod(data.shape[1:]))
+    n_features = data.shape[0] + len(indices)
+    rows = max(1, max_bytes // (n_features * np.dtype(dtype).itemsize))
+    rows = min(rows, n_pixels)
+    buffer = np.empty((rows, n_features), dtype=dtype)
+    logger.debug(f"Building features in chunks of {rows} pixels")
+
+    flat_mask = valid_mask.ravel() if valid_mask is not None else None
+    for start in range(0, n_pixels, rows):
+        stop = min(start + rows, n_pixels)
+        pixel_slice = slice(start, stop)
+        n_rows = stop - start
+        if flat_mask is not None:
+            n_rows = int(np.count_nonzero(flat_mask[pixel_slice]))
+        features = build_features(
+            data,
+            out=buffer[:n_rows],
+            dtype=dtype,
+            band_order=band_order,
+            indices=indices,
+            pixel_slice=pixel_slice,
+            valid_mask=valid_mask,
+        )
+        yield pixel_slice, features
@@ -0,0 +1,321 @@
+import json
+from typing import List, Optional
+
+import numpy as np
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+FOREST_MAGIC = b"S2FOREST"
+FOREST_FORMAT_VERSION = 1
+
+# scikit-learn releases whose private tree state layout to_sklearn rebuilds
+# ([min, max) as (major, minor)); keep in sync with pyproject.toml
+SUPPORTED_SKLEARN = ((1, 7), (1, 10))
+
+# Node record fields of that layout
+_SKLEARN_NODE_FIELDS = (
+    "left_child",
+    "right_child",
+    "feature",
+    "threshold",
+    "impurity",
+    "n_node_samples",
+    "weighted_n_node_samples",
+    "missing_go_to_left",
+)
+
+# Arrays are aligned so memory-mapped views are naturally aligned
+_ALIGNMENT = 64
+
+# Node arrays stored in the file, in order
+_ARRAY_NAMES = (
+    "tree_offsets",
+    "feature",
+    "threshold",
+    "children_left",
+    "children_right",
+    "value",
+)
+
+
+def is_forest_file(filepath: str) -> bool:
+    """Return True if *filepath* starts with the compact forest magic bytes."""
+    with open(filepath, "rb") as f:
+        return f.read(len(FOREST_MAGIC)) == FOREST_MAGIC
+
+
+def check_feature_layout(
+    metadata: dict,
+    band_order: Optional[List[str]] = None,
+    target_resolution: Optional[int] = None,
+    indices: Optional[List[str]] = None,
+) -> None:
+    """Raise ValueError if a feature layout differs from the one in *metadata*.
+
+    Arguments left as None, and layouts the metadata does not record, are not
+    checked.
+    """
+    expected = {
+        "band_order": band_order,
+        "target_resolution": target_resolution,
+        "indices": indices,
+    }
+    for key, value in expected.items():
+        recorded = metadata.get(key)
+        if value is not None and recorded is not None and value != recorded:
+            raise ValueError(f"Model was trained with {key}={recorded}, got {value}")
+
+
+def check_sklearn_support() -> None:
+    """Raise ValueError unless the installed scikit-learn can rebuild forests.
+
+    ``FlatForest.to_sklearn`` restores trees through scikit-learn's private
+    tree state, so it is limited to ``SUPPORTED_SKLEARN`` releases with the
+    expected node layout.
+    """
+    import sklearn
+    from sklearn.tree._tree import NODE_DTYPE
+
+    version = tuple(int(part) for part in sklearn.__version__.split(".")[:2])
+    low, high = SUPPORTED_SKLEARN
+    if not low <= version < high or NODE_DTYPE.names != _SKLEARN_NODE_FIELDS:
+        raise ValueError(
+            f"Loading compact forest files needs scikit-learn >={low[0]}.{low[1]},"
+            f"<{high[0]}.{high[1]} (found {sklearn.__version__}); "
+            "use a supported release or a pickled model"
+        )
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+class FlatForest:
+    """Decision forest stored as flat, typed node arrays.
+
+    All trees are concatenated: node ``i`` of tree ``t`` is global node
+    ``tree_offsets[t] + i`` and children hold global node indices. Leaves have
+    ``feature == -2`` and point to themselves. ``value`` holds the class
+    probabilities of every node. Metadata records the feature layout (band
+    order, resolution, indices) the forest was trained on.
+
+    This is a storage format; ``to_sklearn`` rebuilds an estimator to predict
+    with.
+    """
+
+    def __init__(self, arrays: dict, metadata: dict):
+        self.arrays = arrays
+        self.metadata = metadata
+        self.classes_ = np.array(metadata["classes"])
+        self.n_features_in_ = metadata["n_features"]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.arrays["tree_offsets"]) - 1
+
+    @classmethod
+    def from_sklearn(
+        cls,
+        estimator,
+        band_order: Optional[List[str]] = None,
+        target_resolution: Optional[int] = None,
+        indices: Optional[List[str]] = None,
+    ) -> "FlatForest":
+        """Flatten a fitted sklearn forest classifier (e.g. RandomForestClassifier)."""
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        if estimator.n_outputs_ != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        sizes = [tree.node_count for tree in trees]
+        tree_offsets = np.zeros(len(trees) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=tree_offsets[1:])
+
+        feature = np.concatenate([tree.feature for tree in trees]).astype(np.int32)
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        children_left = np.empty(tree_offsets[-1], dtype=np.int32)
+        children_right = np.empty(tree_offsets[-1], dtype=np.int32)
+        value = np.empty((tree_offsets[-1], len(estimator.classes_)))
+
+        for tree, start, stop in zip(trees, tree_offsets[:-1], tree_offsets[1:]):
+            nodes = np.arange(start, stop, dtype=np.int32)
+            is_leaf = tree.children_left < 0
+            children_left[start:stop] = np.where(
+                is_leaf, nodes, tree.children_left + start
+            )
+            children_right[start:stop] = np.where(
+                is_leaf, nodes, tree.children_right + start
+            )
+            tree_value = tree.value[:, 0, :]
+            totals = tree_value.sum(axis=1, keepdims=True)
+            # sklearn >= 1.4 stores class fractions and uses them as is; older
+            # versions store counts and normalize at predict time
+            if not np.allclose(totals, 1.0):
+                tree_value = tree_value / totals
+            value[start:stop] = tree_value
+
+        metadata = {
+            "format_version": FOREST_FORMAT_VERSION,
+            "estimator": type(estimator).__name__,
+            "classes": estimator.classes_.tolist(),
+            "n_features": int(estimator.n_features_in_),
+            "band_order": band_order,
+            "target_resolution": target_resolution,
+            "indices": indices or [],
+        }
+        arrays = {
+            "tree_offsets": tree_offsets,
+            "feature": feature,
+            "threshold": threshold,
+            "children_left": children_left,
+            "children_right": children_right,
+            "value": value,
+        }
+        return cls(arrays, metadata)
+
+    def save(self, filepath: str) -> None:
+        """Write the forest as one file: magic, JSON header, aligned raw arrays."""
+        layout = []
+        offset = 0
+        for name in _ARRAY_NAMES:
+            array = np.ascontiguousarray(self.arrays[name])
+            offset = _align(offset)
+            layout.append(
+                {
+                    "name": name,
+                    "dtype": array.dtype.str,
+                    "shape": list(array.shape),
+                    "offset": offset,
+                }
+            )
+            offset += array.nbytes
+
+        header = json.dumps({"metadata": self.metadata, "arrays": layout}).encode()
+        data_start = _align(len(FOREST_MAGIC) + 8 + len(header))
+
+        with open(filepath, "wb") as f:
+            f.write(FOREST_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for entry in layout:
+                f.seek(data_start + entry["offset"])
+                f.write(np.ascontiguousarray(self.arrays[entry["name"]]).tobytes())
+        logger.info(f"Saved {self.n_trees}-tree forest to {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str, mmap: bool = True) -> "FlatForest":
+        """Load a forest file; with *mmap*, arrays are shared read-only memory maps."""
+        with open(filepath, "rb") as f:
+            if f.read(len(FOREST_MAGIC)) != FOREST_MAGIC:
+                raise ValueError(f"{filepath} is not a forest file")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_size))
+        data_start = _align(len(FOREST_MAGIC) + 8 + header_size)
+
+        if header["metadata"]["format_version"] > FOREST_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported forest format version {header['metadata']['format_version']}"
+            )
+
+        arrays = {}
+        for entry in header["arrays"]:
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            offset = data_start + entry["offset"]
+            if mmap:
+                arrays[entry["name"]] = np.memmap(
+                    filepath, dtype=dtype, mode="r", offset=offset, shape=shape
+                )
+            else:
+                arrays[entry["name"]] = np.fromfile(
+                    filepath, dtype=dtype, count=int(np.prod(shape)), offset=offset
+                ).reshape(shape)
+        return cls(arrays, header["metadata"])
+
+    def to_sklearn(self):
+        """Rebuild a fitted ``RandomForestClassifier`` from the node arrays.
+
+        Prediction runs in scikit-learn's compiled tree traversal with the
+        original estimator's exact probabilities. The nodes are copied into the
+        trees and only prediction state is restored (impurities and sample
+        counts are zero). The metadata is kept as ``forest_metadata_``. Raises
+        ValueError outside the supported scikit-learn releases (see
+        ``check_sklearn_support``).
+        """
+        check_sklearn_support()
+
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+        from sklearn.tree._tree import NODE_DTYPE, Tree
+
+        tree_offsets = np.asarray(self.arrays["tree_offsets"])
+        feature = np.asarray(self.arrays["feature"])
+        children_left = np.asarray(self.arrays["children_left"])
+        children_right = np.asarray(self.arrays["children_right"])
+        value = np.asarray(self.arrays["value"])
+        is_leaf = feature < 0
+        n_classes = len(self.classes_)
+
+        # Depth of every tree, walking all trees one level at a time
+        max_depth = np.zeros(self.n_trees, dtype=np.int64)
+        nodes = tree_offsets[:-1].astype(np.intp)
+        trees = np.arange(self.n_trees)
+        depth = 0
+        while nodes.size:
+            max_depth[trees] = depth
+            inner = ~is_leaf[nodes]
+            nodes = np.concatenate(
+                [children_left[nodes[inner]], children_right[nodes[inner]]]
+            )
+            trees = np.tile(trees[inner], 2)
+            depth += 1
+
+        estimators = []
+        for t, (start, stop) in enumerate(zip(tree_offsets[:-1], tree_offsets[1:])):
+            leaf = is_leaf[start:stop]
+            nodes = np.zeros(stop - start, dtype=NODE_DTYPE)
+            # Back to local child indices, with -1 (TREE_LEAF) for leaves
+            nodes["left_child"] = np.where(leaf, -1, children_left[start:stop] - start)
+            nodes["right_child"] = np.where(
+                leaf, -1, children_right[start:stop] - start
+            )
+            nodes["feature"] = feature[start:stop]
+            nodes["threshold"] = self.arrays["threshold"][start:stop]
+
+            tree = Tree(self.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+            tree.__setstate__(
+                {
+                    "max_depth": int(max_depth[t]),
+                    "node_count": int(stop - start),
+                    "nodes": nodes,
+                    "values": np.ascontiguousarray(value[start:stop, None, :]),
+                }
+            )
+            estimator = DecisionTreeClassifier()
+            estimator.tree_ = tree
+            estimator.n_features_in_ = self.n_features_in_
+            estimator.max_features_ = self.n_features_in_
+            estimator.n_outputs_ = 1
+            estimator.n_classes_ = n_classes
+            estimator.classes_ = np.arange(n_classes, dtype=np.float64)
+            estimators.append(estimator)
+
+        forest = RandomForestClassifier(n_estimators=self.n_trees)
+        forest.estimators_ = estimators
+        forest.estimator_ = DecisionTreeClassifier()
+        forest.n_features_in_ = self.n_features_in_
+        forest.n_outputs_ = 1
+        forest.n_classes_ = n_classes
+        forest.classes_ = self.classes_
+        forest.forest_metadata_ = dict(self.metadata)
+        return forest
+
+    def check_features(
+        self,
+        band_order: Optional[List[str]] = None,
+        target_resolution: Optional[int] = None,
+        indices: Optional[List[str]] = None,
+    ) -> None:
+        """Raise ValueError if the feature layout differs from the training one."""
+        check_feature_layout(self.metadata, band_order, target_resolution, indices)
@@ -1,10 +1,18 @@
 import json
-from typing import Dict, Optional, Tuple
+import math
+from functools import lru_cache
+from typing import Iterator, List, Tuple
 
 import numpy as np
 import rasterio
+from affine import Affine
+from rasterio.errors import WindowError
+from rasterio.features import bounds as geometry_bounds
+from rasterio.features import geometry_mask
 from rasterio.mask import mask
 from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
 
 from .logging_config import get_logger
 
@@ -17,27 +25,93 @@ def load_geojson(geojson_path: str) -> dict:
         return json.load(f)
 
 
+def iter_geometries(geojson: dict) -> Iterator[dict]:
+    """Yield every geometry of a FeatureCollection, Feature or geometry object.
+
+    GeometryCollections are flattened; features without a geometry are skipped.
+    """
+    kind = geojson.get("type")
+    if kind == "FeatureCollection":
+        for feature in geojson["features"]:
+            yield from iter_geometries(feature)
+    elif kind == "Feature":
+        if geojson.get("geometry"):
+            yield from iter_geometries(geojson["geometry"])
+    elif kind == "GeometryCollection":
+        for geometry in geojson["geometries"]:
+            yield from iter_geometries(geometry)
+    else:
+        yield geojson
+
+
+def _find_positions(container, key, slots: list) -> None:
+    """Append ``(container, key, is_point)`` for each position sequence under it."""
+    value = container[key]
+    if value and isinstance(value[0], (int, float)):
+        slots.append((container, key, True))
+    elif not value or (value[0] and isinstance(value[0][0], (int, float))):
+        slots.append((container, key, False))
+    else:
+        # Nested parts or rings; an empty one (e.g. ``[[]]``) is its own slot
+        for i in range(len(value)):
+            _find_positions(value, i, slots)
+
+
+def _coordinate_arrays(geojson: dict) -> Tuple[list, List[np.ndarray]]:
+    """Return the position slots of every ring and part, and their coordinates.
+
+    Each array is (positions x dimensions) float64; a Point is one position.
+    """
+    slots = []
+    for geometry in iter_geometries(geojson):
+        _find_positions(geometry, "coordinates", slots)
+    arrays = [
+        np.atleast_2d(np.asarray(container[key], dtype=np.float64))
+        if container[key]
+        else np.empty((0, 2))
+        for container, key, _ in slots
+    ]
+    return slots, arrays
+
+
+@lru_cache(maxsize=32)
+def get_transformer(source_crs: str, target_crs: str):
+    """Return a cached x/y-ordered pyproj Transformer, or None for the same CRS."""
+    from pyproj import CRS, Transformer
+
+    if CRS.from_user_input(source_crs) == CRS.from_user_input(target_crs):
+        return None
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+
 def validate_and_transform_crs(geojson: dict, target_crs: str = "EPSG:4326") -> dict:
-    """Validate and transform GeoJSON CRS to target CRS if needed."""
+    """Validate and transform GeoJSON CRS to target CRS if needed.
+
+    Every ring, part and feature is transformed in place with one array call;
+    Z values are kept.
+    """
     # Check if CRS is specified
     crs = geojson.get("crs", {}).get("properties", {}).get("name", "EPSG:4326")
     logger.debug(f"GeoJSON CRS: {crs}, target CRS: {target_crs}")
 
     if crs != target_crs:
-        logger.info("Transforming from Web Mercator to WGS84")
-        # Transform from Web Mercator to WGS84
-        from pyproj import Transformer
+        transformer = get_transformer(crs, target_crs)
+        if transformer is not None:
+            slots, arrays = _coordinate_arrays(geojson)
+            logger.info(
+                f"Transforming {sum(len(a) for a in arrays)} ROI vertices "
+                f"from {crs} to {target_crs}"
+            )
+            xy = np.concatenate([a[:, :2] for a in arrays] or [np.empty((0, 2))])
+            x, y = transformer.transform(xy[:, 0], xy[:, 1])
 
-        transformer = Transformer.from_crs(crs, target_crs, always_xy=True)
-
-        # Transform coordinates
-        for feature in geojson["features"]:
-            coords = feature["geometry"]["coordinates"][0]  # Assuming polygon
-            transformed_coords = []
-            for coord in coords:
-                x, y = transformer.transform(coord[0], coord[1])
-                transformed_coords.append([x, y])
-            feature["geometry"]["coordinates"] = [transformed_coords]
+            start = 0
+            for (container, key, is_point), coords in zip(slots, arrays):
+                end = start + len(coords)
+                coords[:, 0] = x[start:end]
+                coords[:, 1] = y[start:end]
+                container[key] = coords[0].tolist() if is_point else coords.tolist()
+                start = end
 
         # Update CRS
         geojson["crs"] = {"type": "name", "properties": {"name": target_crs}}
@@ -71,39 +145,119 @@ def crop_raster_with_geojson(
         return cropped_data, profile
 
 
-def crop_multispectral_data(
-    data: np.ndarray, profile: dict, geojson: dict
-) -> Tuple[np.ndarray, dict]:
-    """Crop multispectral data array using GeoJSON polygon."""
-    # Create temporary raster to use rasterio mask
-    import tempfile
-    import os
+def get_roi_geometries(geojson: dict) -> List[dict]:
+    """Return the geometries used as region of interest (first feature)."""
+    return [geojson["features"][0]["geometry"]]
+
 
-    with tempfile.NamedTemporaryFile(suffix=".tif", delete=False) as tmp_file:
-        temp_path = tmp_file.name
+def get_bounds_window(
+    bounds: Tuple[float, float, float, float],
+    transform: Affine,
+    width: int,
+    height: int,
+) -> Window:
+    """Compute the whole-pixel window covering *bounds*, clipped to the raster."""
+    window = from_bounds(*bounds, transform)
+    col_off = math.floor(window.col_off)
+    row_off = math.floor(window.row_off)
+    col_end = math.ceil(window.col_off + window.width)
+    row_end = math.ceil(window.row_off + window.height)
 
     try:
-        # Write data to temporary file
-        with rasterio.open(temp_path, "w", **profile) as dst:
-            dst.write(data)
+        return Window(
+            col_off, row_off, col_end - col_off, row_end - row_off
+        ).intersection(Window(0, 0, width, height))
+    except WindowError:
+        raise ValueError("Input shapes do not overlap raster.")
 
-        # Crop using the temporary file
-        cropped_data, cropped_profile = crop_raster_with_geojson(temp_path, geojson)
 
-        return cropped_data, cropped_profile
+def get_geometry_window(
+    geometries: List[dict], transform: Affine, width: int, height: int
+) -> Window:
+    """Compute the pixel window covering *geometries*, clipped to the raster."""
+    feature_bounds = [geometry_bounds(geometry) for geometry in geometries]
+    left = min(b[0] for b in feature_bounds)
+    bottom = min(b[1] for b in feature_bounds)
+    right = max(b[2] for b in feature_bounds)
+    top = max(b[3] for b in feature_bounds)
+    return get_bounds_window((left, bottom, right, top), transform, width, height)
 
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
 
+class RoiIndex:
+    """Bounding boxes of the features of a FeatureCollection, for overlap queries.
 
-def get_roi_bounds(geojson: dict) -> Tuple[float, float, float, float]:
-    """Get bounding box from GeoJSON polygon."""
-    geometry = geojson["features"][0]["geometry"]
-    coords = geometry["coordinates"][0]
+    ``bounds`` is a (features x 4) array of (minx, miny, maxx, maxy) in file
+    order; features without a geometry or coordinates have NaN bounds and
+    never match.
+    """
+
+    def __init__(self, geojson: dict):
+        self.features = geojson["features"]
+        self.bounds = np.full((len(self.features), 4), np.nan)
+        for i, feature in enumerate(self.features):
+            _, arrays = _coordinate_arrays(feature)
+            coords = np.concatenate([a[:, :2] for a in arrays] or [np.empty((0, 2))])
+            if len(coords):
+                self.bounds[i, :2] = coords.min(axis=0)
+                self.bounds[i, 2:] = coords.max(axis=0)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def query(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """Return the indices of features whose bounding box overlaps *bounds*."""
+        left, bottom, right, top = bounds
+        minx, miny, maxx, maxy = self.bounds.T
+        return np.flatnonzero(
+            (minx < right) & (maxx > left) & (miny < top) & (maxy > bottom)
+        )
+
+
+def get_geometry_mask(
+    geometries: List[dict], window: Window, transform: Affine
+) -> np.ndarray:
+    """Rasterize *geometries* over *window*; True marks pixels inside the ROI."""
+    return geometry_mask(
+        geometries,
+        out_shape=(int(window.height), int(window.width)),
+        transform=window_transform(window, transform),
+        invert=True,
+    )
 
-    lons = [coord[0] for coord in coords]
-    lats = [coord[1] for coord in coords]
 
-    return min(lons), min(lats), max(lons), max(lats)  # minx, miny, maxx, maxy
+def crop_multispectral_data(
+    data: np.ndarray, profile: dict, geojson: dict
+) -> Tuple[np.ndarray, dict]:
+    """Crop multispectral data array using GeoJSON polygon."""
+    geometries = get_roi_geometries(geojson)
+    window = get_geometry_window(
+        geometries, profile["transform"], profile["width"], profile["height"]
+    )
+    row_slice, col_slice = window.toslices()
+
+    cropped_data = data[:, row_slice, col_slice].copy()
+    inside = get_geometry_mask(geometries, window, profile["transform"])
+    cropped_data[:, ~inside] = 0
+
+    cropped_profile = profile.copy()
+    cropped_profile.update(
+        {
+            "driver": "GTiff",
+            "nodata": 0,
+            "height": cropped_data.shape[1],
+            "width": cropped_data.shape[2],
+            "transform": window_transform(window, profile["transform"]),
+        }
+    )
+    return cropped_data, cropped_profile
+
+
+def get_roi_bounds(geojson: dict) -> Tuple[float, float, float, float]:
+    """Get the bounding box of every geometry (all features, parts and rings)."""
+    _, arrays = _coordinate_arrays(geojson)
+    coords = np.concatenate([a[:, :2] for a in arrays] or [np.empty((0, 2))])
+    if not len(coords):
+        raise ValueError("GeoJSON has no coordinates")
+    minx, miny = coords.min(axis=0)
+    maxx, maxy = coords.max(axis=0)
+    return float(minx), float(miny), float(maxx), float(maxy)
@@ -0,0 +1,253 @@
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .classifier import Sentinel2Classifier
+from .data_loader import prepare_features
+from .logging_config import get_logger
+from .masking import compute_valid_mask
+from .resampling import ResampledBandReader
+from .safe_product import load_safe_product
+from .sampling import StratifiedSampler
+from .streaming import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    iter_row_windows,
+    plan_rows_per_window,
+)
+
+logger = get_logger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+DEFAULT_MAX_SAMPLES_PER_CLASS = 100_000
+
+
+def iter_scene_batches(
+    safe_folders: Sequence[str],
+    band_order: List[str],
+    target_resolution: int,
+    label_fn: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    indices: Sequence[str] = (),
+    start_batch: int = 0,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Yield ``(batch_index, features, labels)`` for every window of every product.
+
+    Bands are read from their native-resolution files and resampled onto the
+    *target_resolution* grid window by window, as ``load_sentinel2_safe_folder``
+    does for a whole scene, by *max_workers* threads. Windows are sized so one
+    batch stays within *memory_budget_mb*, and only valid (non-zero) pixels are
+    featurized. ``label_fn(data, valid_mask)`` returns the labels of the valid
+    pixels of a window. Batches before *start_batch* are skipped without being
+    read.
+    """
+    if max_workers is None:
+        max_workers = min(len(band_order), os.cpu_count() or 1)
+
+    batch_index = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for safe_folder in safe_folders:
+            band_paths = load_safe_product(safe_folder).get_band_paths(
+                band_order, target_resolution
+            )
+            for band in band_order:
+                if band not in band_paths:
+                    raise ValueError(f"Band {band} is not available in {safe_folder}")
+            reader = ResampledBandReader(
+                {band: band_paths[band] for band in band_order},
+                target_resolution,
+                upsampling=upsampling,
+            )
+            height, width = reader.profile["height"], reader.profile["width"]
+
+            # Window, float32 features, labels and sampler keys per pixel
+            n_features = len(band_order) + len(indices)
+            bytes_per_pixel = (
+                len(band_order) * reader.dtype.itemsize + n_features * 4 + 16
+            )
+            rows_per_window = plan_rows_per_window(
+                height,
+                width,
+                bytes_per_pixel,
+                memory_budget_mb,
+                reader.profile.get("blockysize", 1),
+            )
+            logger.info(
+                f"Streaming {os.path.basename(safe_folder)} in windows of "
+                f"{rows_per_window} rows"
+            )
+
+            for window in iter_row_windows(height, width, rows_per_window):
+                if batch_index >= start_batch:
+                    data = reader.read(window, executor)
+                    # Sentinel-2 DN 0 is NO_DATA
+                    valid_mask = compute_valid_mask(data)
+                    features = prepare_features(
+                        data,
+                        band_order=band_order,
+                        indices=indices,
+                        valid_mask=valid_mask,
+                    )
+                    yield batch_index, features, label_fn(data, valid_mask)
+                batch_index += 1
+
+
+class IncrementalTrainer:
+    """Train a classifier from a stream of ``(features, labels)`` batches.
+
+    Estimators with ``partial_fit`` (e.g. SGDClassifier) are updated batch by
+    batch. Others, such as forests, feed a ``StratifiedSampler`` reservoir of
+    at most *max_samples_per_class* pixels per class that is fitted once in
+    ``finish``. Either way memory is bounded by one batch plus the model or
+    reservoir, and the state can be checkpointed after any batch.
+    """
+
+    def __init__(
+        self,
+        classifier: Sentinel2Classifier,
+        classes: Optional[Sequence] = None,
+        max_samples_per_class: int = DEFAULT_MAX_SAMPLES_PER_CLASS,
+        random_state: Optional[int] = 42,
+    ):
+        self.classifier = classifier
+        self.incremental = hasattr(classifier.classifier, "partial_fit")
+        if self.incremental and classes is None:
+            raise ValueError(
+                "classes is required for estimators trained with partial_fit"
+            )
+        self.classes = np.asarray(classes) if classes is not None else None
+        self.sampler = (
+            None
+            if self.incremental
+            else StratifiedSampler(max_samples_per_class, random_state)
+        )
+        self.batches_done = 0
+        self.pixels_seen = 0
+
+    def update(self, features: np.ndarray, labels: np.ndarray) -> None:
+        """Consume one batch."""
+        if features.shape[0]:
+            if self.incremental:
+                self.classifier.classifier.partial_fit(
+                    features, labels, classes=self.classes
+                )
+            else:
+                self.sampler.update(features, labels)
+        self.batches_done += 1
+        self.pixels_seen += features.shape[0]
+
+    def finish(self) -> Sentinel2Classifier:
+        """Fit the reservoir (if any) and return the trained classifier."""
+        if not self.incremental:
+            features, labels = self.sampler.result()
+            self.classifier.train(features, labels)
+        logger.info(
+            f"Incremental training done: {self.batches_done} batches, "
+            f"{self.pixels_seen} pixels"
+        )
+        return self.classifier
+
+    def save_checkpoint(self, path: str, fingerprint: Optional[dict] = None) -> None:
+        """Atomically write the training state to *path*."""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "fingerprint": fingerprint,
+            "batches_done": self.batches_done,
+            "pixels_seen": self.pixels_seen,
+            "classes": self.classes,
+            "estimator": self.classifier.classifier,
+            "sampler": self.sampler,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp_path, path)
+        logger.debug(f"Checkpoint saved after {self.batches_done} batches")
+
+    def load_checkpoint(self, path: str, fingerprint: Optional[dict] = None) -> None:
+        """Restore the state written by ``save_checkpoint`` to resume training.
+
+        Raise ValueError if the checkpoint was written for other inputs.
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state["version"] > CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state['version']}")
+        if fingerprint is not None and state["fingerprint"] != fingerprint:
+            raise ValueError(f"Checkpoint {path} was written for different inputs")
+
+        self.classifier.classifier = state["estimator"]
+        self.incremental = state["sampler"] is None
+        self.sampler = state["sampler"]
+        self.classes = state["classes"]
+        self.batches_done = state["batches_done"]
+        self.pixels_seen = state["pixels_seen"]
+        logger.info(f"Resuming from {path} after {self.batches_done} batches")
+
+
+def train_incremental(
+    classifier: Sentinel2Classifier,
+    safe_folders: Sequence[str],
+    band_order: List[str],
+    target_resolution: int,
+    label_fn: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    classes: Optional[Sequence] = None,
+    max_samples_per_class: int = DEFAULT_MAX_SAMPLES_PER_CLASS,
+    indices: Sequence[str] = (),
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 10,
+    random_state: Optional[int] = 42,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+) -> Sentinel2Classifier:
+    """Train *classifier* out of core on the windows of many SAFE products.
+
+    See ``iter_scene_batches`` and ``IncrementalTrainer``. With
+    *checkpoint_path*, the state is saved every *checkpoint_every* batches and
+    at the end, and an existing checkpoint for the same inputs is resumed.
+    """
+    fingerprint = {
+        "safe_folders": [os.path.abspath(path) for path in safe_folders],
+        "band_order": list(band_order),
+        "target_resolution": target_resolution,
+        "indices": list(indices),
+        "memory_budget_mb": memory_budget_mb,
+        "upsampling": upsampling,
+        "classes": None if classes is None else np.asarray(classes).tolist(),
+        "max_samples_per_class": max_samples_per_class,
+        "random_state": random_state,
+    }
+    trainer = IncrementalTrainer(
+        classifier, classes, max_samples_per_class, random_state
+    )
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        trainer.load_checkpoint(checkpoint_path, fingerprint)
+
+    for batch_index, features, labels in iter_scene_batches(
+        safe_folders,
+        band_order,
+        target_resolution,
+        label_fn,
+        memory_budget_mb,
+        indices,
+        start_batch=trainer.batches_done,
+        max_workers=max_workers,
+        upsampling=upsampling,
+    ):
+        trainer.update(features, labels)
+        logger.info(
+            f"Batch {batch_index + 1}: {features.shape[0]} pixels "
+            f"({trainer.pixels_seen} total)"
+        )
+        if checkpoint_path and trainer.batches_done % checkpoint_every == 0:
+            trainer.save_checkpoint(checkpoint_path, fingerprint)
+
+    if checkpoint_path:
+        trainer.save_checkpoint(checkpoint_path, fingerprint)
+    return trainer.finish()
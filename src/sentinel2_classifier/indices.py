@@ -1,30 +1,196 @@
+from typing import List, Optional, Sequence
+
 import numpy as np
 
 from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Sentinel-2 bands that can play each spectral role, in order of preference
+band_roles = {
+    "blue": ["B02"],
+    "green": ["B03"],
+    "red": ["B04"],
+    "nir": ["B08", "B8A"],
+    "swir1": ["B11"],
+    "swir2": ["B12"],
+}
+
+# Spectral roles each index needs
+index_roles = {
+    "ndvi": ["nir", "red"],
+    "ndwi": ["green", "nir"],
+    "ndbi": ["swir1", "nir"],
+    "mndwi": ["green", "swir1"],
+    "nbr": ["nir", "swir2"],
+    "evi": ["nir", "red", "blue"],
+    "savi": ["nir", "red"],
+}
+
+# Default chunk size (pixels) of the fused index pass
+DEFAULT_CHUNK_PIXELS = 1024 * 1024
+
+# Scale used when indices are stored as int16
+INT16_INDEX_SCALE = 10000
+
 
 def calculate_ndvi(red_band: np.ndarray, nir_band: np.ndarray) -> np.ndarray:
     """Calculate NDVI: (NIR - Red) / (NIR + Red)"""
+    denominator = nir_band + red_band
     return np.divide(
         nir_band - red_band,
-        nir_band + red_band,
+        denominator,
         out=np.zeros_like(nir_band),
-        where=(nir_band + red_band) != 0,
+        where=denominator != 0,
     )
 
 
 def calculate_ndwi(green_band: np.ndarray, nir_band: np.ndarray) -> np.ndarray:
     """Calculate NDWI: (Green - NIR) / (Green + NIR)"""
+    denominator = green_band + nir_band
     return np.divide(
         green_band - nir_band,
-        green_band + nir_band,
+        denominator,
         out=np.zeros_like(green_band),
-        where=(green_band + nir_band) != 0,
+        where=denominator != 0,
     )
 
 
+def get_role_band_indices(band_order: List[str], roles: Sequence[str]) -> dict:
+    """Map spectral roles to positions in *band_order*."""
+    positions = {}
+    for role in roles:
+        for band in band_roles[role]:
+            if band in band_order:
+                positions[role] = band_order.index(band)
+                break
+        else:
+            raise ValueError(
+                f"No {role} band ({', '.join(band_roles[role])}) in {band_order}"
+            )
+    return positions
+
+
+class _IndexChunk:
+    """Bands and shared sub-expressions of one chunk, computed at most once."""
+
+    def __init__(self, data: np.ndarray, positions: dict, offset: float):
+        self._data = data
+        self._positions = positions
+        self._offset = offset
+        self._cache = {}
+
+    def band(self, role: str) -> np.ndarray:
+        if role not in self._cache:
+            band = self._data[self._positions[role]].astype(np.float32)
+            if self._offset:
+                band += self._offset
+            self._cache[role] = band
+        return self._cache[role]
+
+    def difference(self, a: str, b: str) -> np.ndarray:
+        key = ("-", a, b)
+        if key not in self._cache:
+            self._cache[key] = self.band(a) - self.band(b)
+        return self._cache[key]
+
+    def sum(self, a: str, b: str) -> np.ndarray:
+        key = ("+", *sorted((a, b)))
+        if key not in self._cache:
+            self._cache[key] = self.band(a) + self.band(b)
+        return self._cache[key]
+
+
+def _normalized_difference(chunk: _IndexChunk, a: str, b: str, out: np.ndarray) -> None:
+    denominator = chunk.sum(a, b)
+    out[...] = 0
+    np.divide(chunk.difference(a, b), denominator, out=out, where=denominator != 0)
+
+
+def _index_numerator_denominator(
+    name: str, chunk: _IndexChunk, reflectance_scale: float
+) -> tuple:
+    """Return (numerator, denominator) of *name*, in digital-number units."""
+    if name == "evi":
+        # 2.5 (N - R) / (N + 6R - 7.5B + 1), rescaled from reflectance to DN
+        denominator = chunk.band("red") * 6.0
+        denominator += chunk.band("nir")
+        denominator -= chunk.band("blue") * 7.5
+        denominator += 1.0 / reflectance_scale
+        return chunk.difference("nir", "red") * 2.5, denominator
+    # savi: 1.5 (N - R) / (N + R + 0.5), rescaled from reflectance to DN
+    denominator = chunk.sum("nir", "red") + 0.5 / reflectance_scale
+    return chunk.difference("nir", "red") * 1.5, denominator
+
+
+def compute_indices(
+    data: np.ndarray,
+    band_order: List[str],
+    indices: Sequence[str] = ("ndvi", "ndwi"),
+    out: Optional[np.ndarray] = None,
+    dtype=np.float32,
+    chunk_pixels: int = DEFAULT_CHUNK_PIXELS,
+    reflectance_scale: float = 1e-4,
+    reflectance_offset: float = 0.0,
+) -> np.ndarray:
+    """Compute several spectral indices in one chunked pass over the band cube.
+
+    *data* is ``(bands, ...)``; the result is ``(len(indices), ...)`` written into
+    *out* when given. With ``dtype=np.int16`` indices are stored scaled by
+    ``INT16_INDEX_SCALE``. Temporaries are proportional to *chunk_pixels* and
+    shared sub-expressions (e.g. NIR + Red for NDVI and SAVI) are computed once
+    per chunk. *reflectance_scale* and *reflectance_offset* convert digital
+    numbers to reflectance (needed by EVI and SAVI and for products with a
+    radiometric offset).
+    """
+    unknown = [name for name in indices if name not in index_roles]
+    if unknown:
+        raise ValueError(f"Unknown indices {unknown}; available: {list(index_roles)}")
+
+    roles = sorted({role for name in indices for role in index_roles[name]})
+    positions = get_role_band_indices(band_order, roles)
+    logger.debug(f"Calculating {list(indices)} with band positions {positions}")
+
+    pixel_shape = data.shape[1:]
+    flat_data = data.reshape(data.shape[0], -1)
+    n_pixels = flat_data.shape[1]
+
+    if out is None:
+        out = np.empty((len(indices),) + pixel_shape, dtype=dtype)
+    elif not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+    flat_out = out.reshape(len(indices), -1)
+    scaled = np.issubdtype(flat_out.dtype, np.integer)
+    offset = reflectance_offset / reflectance_scale
+
+    result = np.empty(min(chunk_pixels, n_pixels), dtype=np.float32)
+    for start in range(0, n_pixels, chunk_pixels):
+        stop = min(start + chunk_pixels, n_pixels)
+        chunk = _IndexChunk(flat_data[:, start:stop], positions, offset)
+        chunk_result = result[: stop - start]
+
+        for i, name in enumerate(indices):
+            if name in ("evi", "savi"):
+                numerator, denominator = _index_numerator_denominator(
+                    name, chunk, reflectance_scale
+                )
+                chunk_result[...] = 0
+                np.divide(
+                    numerator, denominator, out=chunk_result, where=denominator != 0
+                )
+            else:
+                _normalized_difference(chunk, *index_roles[name], chunk_result)
+
+            if scaled:
+                chunk_result *= INT16_INDEX_SCALE
+                np.rint(chunk_result, out=chunk_result)
+                info = np.iinfo(flat_out.dtype)
+                np.clip(chunk_result, info.min, info.max, out=chunk_result)
+            flat_out[i, start:stop] = chunk_result
+
+    return out
+
+
 def calculate_indices_from_sentinel2(
     data: np.ndarray, band_order: list = None
 ) -> tuple:
@@ -46,28 +212,14 @@ def calculate_indices_from_sentinel2(
 
     logger.debug(f"Calculating indices with band order: {band_order}")
 
-    # Find band indices
     try:
-        green_idx = band_order.index("B03")  # Green
-        red_idx = band_order.index("B04")  # Red
-        if "B08" in band_order:
-            nir_idx = band_order.index("B08")  # NIR
-        elif "B8A" in band_order:
-            nir_idx = band_order.index("B8A")  # NIR
-        logger.debug(
-            f"Band indices - Green: {green_idx}, Red: {red_idx}, NIR: {nir_idx}"
-        )
+        get_role_band_indices(band_order, ["green", "red", "nir"])
     except ValueError:
-        # Fallback to positional indexing if band names not found
-        green_idx, red_idx, nir_idx = 1, 2, 3
+        # Fallback to positional indexing (green=1, red=2, nir=3)
+        band_order = ["B02", "B03", "B04", "B08"]
         logger.warning("Band names not found, using positional indexing")
-    print(data.shape)
-    green = data[green_idx].astype(np.float32)
-    red = data[red_idx].astype(np.float32)
-    nir = data[nir_idx].astype(np.float32)
 
     logger.info("Calculating NDVI and NDWI indices")
-    ndvi = calculate_ndvi(red, nir)
-    ndwi = calculate_ndwi(green, nir)
+    ndvi, ndwi = compute_indices(data, band_order, ("ndvi", "ndwi"))
 
     return ndvi, ndwi
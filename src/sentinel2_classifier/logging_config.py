@@ -1,14 +1,20 @@
 import logging
+import os
 import sys
 from typing import Optional
 
 
 def setup_logger(
     name: str = "sentinel2_classifier",
-    level: str = "INFO",
+    level: Optional[str] = None,
     format_string: Optional[str] = None,
 ) -> logging.Logger:
-    """Setup logger with configurable level and format."""
+    """Setup logger with configurable level and format.
+
+    *level* defaults to the ``SENTINEL2_LOG_LEVEL`` environment variable, or INFO.
+    """
+    if level is None:
+        level = os.getenv("SENTINEL2_LOG_LEVEL", "INFO")
     if format_string is None:
         format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
@@ -0,0 +1,69 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Value written to classified rasters for pixels that were not classified
+CLASS_NODATA = 255
+
+# Scene classification (SCL) codes: 0 = NO_DATA, 1 = SATURATED_OR_DEFECTIVE
+scl_invalid_classes = (0, 1)
+
+
+def compute_valid_mask(
+    data: np.ndarray,
+    nodata: Union[None, float, Sequence[Optional[float]]] = 0,
+    roi_mask: Optional[np.ndarray] = None,
+    scl: Optional[np.ndarray] = None,
+    invalid_scl_classes: Sequence[int] = scl_invalid_classes,
+) -> np.ndarray:
+    """Return a (height, width) mask that is True for pixels worth classifying.
+
+    A pixel is invalid when any band equals *nodata* (one value for all bands
+    or one per band; None skips the check, NaN matches NaN), when it lies
+    outside *roi_mask*, or when its *scl* class is one of *invalid_scl_classes*.
+    """
+    valid = np.ones(data.shape[1:], dtype=bool)
+    if np.ndim(nodata) == 0:
+        nodata = [nodata] * len(data)
+    for band, band_nodata in zip(data, nodata):
+        if band_nodata is None:
+            continue
+        if np.isnan(band_nodata):
+            valid &= ~np.isnan(band)
+        else:
+            valid &= band != band_nodata
+    if roi_mask is not None:
+        valid &= roi_mask
+    if scl is not None:
+        valid &= ~np.isin(scl, invalid_scl_classes)
+
+    logger.debug(f"Valid pixels: {valid.sum()} of {valid.size}")
+    return valid
+
+
+def label_dtype(dtype, nodata: int = CLASS_NODATA) -> np.dtype:
+    """Return a dtype that holds labels of *dtype* as well as *nodata*.
+
+    Numeric labels are promoted to fit *nodata*; other labels (e.g. strings)
+    use object arrays so *nodata* keeps its own type.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind in "biuf":
+        return np.promote_types(dtype, np.min_scalar_type(nodata))
+    return np.dtype(object)
+
+
+def scatter_predictions(
+    predictions: np.ndarray, valid_mask: np.ndarray, nodata: int = CLASS_NODATA
+) -> np.ndarray:
+    """Expand predictions of the valid pixels to all pixels, filling *nodata*."""
+    flat_mask = valid_mask.ravel()
+    output = np.full(
+        flat_mask.size, nodata, dtype=label_dtype(predictions.dtype, nodata)
+    )
+    output[flat_mask] = predictions
+    return output
@@ -0,0 +1,170 @@
+import atexit
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from rasterio.windows import Window
+
+from .classifier import Sentinel2Classifier
+from .forest_format import FlatForest, is_forest_file
+from .logging_config import get_logger
+from .masking import CLASS_NODATA
+from .raster_processor import ClassifiedRasterWriter
+from .streaming import (
+    DEFAULT_MEMORY_BUDGET_MB,
+    DEFAULT_N_CLASSES,
+    check_band_layout,
+    classify_window,
+    estimate_bytes_per_pixel,
+    iter_row_windows,
+    open_band_sources,
+    plan_rows_per_window,
+)
+
+logger = get_logger(__name__)
+
+# Per-process state set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(
+    model_path: str,
+    sources: Union[str, Sequence[str]],
+    nodata: int,
+    dedup: bool,
+    band_order: Optional[List[str]],
+    target_resolution: Optional[int],
+) -> None:
+    """Load the model and open the band sources once per worker process."""
+    classifier = Sentinel2Classifier(dedup=dedup)
+    classifier.load_model(model_path)
+    # Parallelism comes from the pool; one thread per worker avoids oversubscription
+    if hasattr(classifier.classifier, "n_jobs"):
+        classifier.classifier.n_jobs = 1
+
+    stack = ExitStack()
+    atexit.register(stack.close)
+    band_sources = open_band_sources(stack, sources)
+    check_band_layout(classifier, len(band_sources), band_order, target_resolution)
+    _worker.update(
+        {
+            "classifier": classifier,
+            "band_sources": band_sources,
+            "stack": stack,
+            "nodata": nodata,
+        }
+    )
+
+
+def _classify_window_in_worker(
+    window: Window,
+) -> Tuple[Window, np.ndarray, Tuple[int, int]]:
+    """Classify one window; also return (pixels, evaluated) deduplication counts."""
+    classifier = _worker["classifier"]
+    memo = classifier.memo
+    before = (memo.pixels, memo.evaluated) if memo is not None else (0, 0)
+    labels = classify_window(
+        classifier, _worker["band_sources"], window, _worker["nodata"]
+    )
+    after = (memo.pixels, memo.evaluated) if memo is not None else (0, 0)
+    return window, labels, (after[0] - before[0], after[1] - before[1])
+
+
+def classify_raster_parallel(
+    model_path: str,
+    sources: Union[str, Sequence[str]],
+    output_path: str,
+    n_workers: Optional[int] = None,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    nodata: int = CLASS_NODATA,
+    dedup: bool = False,
+    band_order: Optional[List[str]] = None,
+    target_resolution: Optional[int] = None,
+) -> dict:
+    """Classify a raster with a pool of worker processes, one window per task.
+
+    Each worker loads the model saved at *model_path* once, then reads,
+    featurizes and predicts whole windows. The parent process is the single
+    writer and writes windows in order. *memory_budget_mb* applies per worker;
+    at most two windows per worker are in flight. With *dedup*, each worker
+    predicts every distinct spectrum once (see ``SpectralMemo``). The feature
+    layout is checked as in ``classify_raster_windowed``.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+
+    with ExitStack() as stack:
+        band_sources = open_band_sources(stack, sources)
+        if is_forest_file(model_path):
+            # Fail here with the actual error rather than as a broken worker pool
+            check_band_layout(
+                Sentinel2Classifier(FlatForest.load(model_path)),
+                len(band_sources),
+                band_order,
+                target_resolution,
+            )
+        ref = band_sources[0][0]
+        height, width = ref.height, ref.width
+
+        # Only workers load the model, so size windows for the default class count
+        bytes_per_pixel = estimate_bytes_per_pixel(
+            len(band_sources), np.dtype(ref.dtypes[0]).itemsize, DEFAULT_N_CLASSES
+        )
+        rows_per_window = plan_rows_per_window(
+            height, width, bytes_per_pixel, memory_budget_mb, ref.block_shapes[0][0]
+        )
+        windows = list(iter_row_windows(height, width, rows_per_window))
+        logger.info(
+            f"Classifying {width}x{height} raster in {len(windows)} windows "
+            f"of {rows_per_window} rows with {n_workers} processes"
+        )
+
+        writer = stack.enter_context(
+            ClassifiedRasterWriter(output_path, ref.profile, nodata)
+        )
+
+        executor = stack.enter_context(
+            # Fresh interpreters rather than forks of a process with open GDAL handles
+            ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    model_path,
+                    sources,
+                    nodata,
+                    dedup,
+                    band_order,
+                    target_resolution,
+                ),
+            )
+        )
+        next_window = iter(windows)
+        pending = deque(
+            executor.submit(_classify_window_in_worker, window)
+            for window in islice(next_window, 2 * n_workers)
+        )
+
+        # Write results in submission order, topping up the queue as we go
+        pixels = evaluated = 0
+        while pending:
+            done_window, labels, counts = pending.popleft().result()
+            pixels += counts[0]
+            evaluated += counts[1]
+            writer.write(labels, done_window)
+            logger.debug(f"Classified window {done_window}")
+            window = next(next_window, None)
+            if window is not None:
+                pending.append(executor.submit(_classify_window_in_worker, window))
+
+    if dedup and pixels:
+        logger.info(
+            f"Deduplicated prediction: evaluated {evaluated} of {pixels} pixels "
+            f"(hit rate {1 - evaluated / pixels:.1%})"
+        )
+    logger.info(f"Classified raster saved to {output_path}")
+    return writer.profile
@@ -0,0 +1,97 @@
+import warnings
+from typing import Dict, Optional, Sequence, Tuple
+
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+
+from .logging_config import get_logger
+from .masking import CLASS_NODATA
+
+logger = get_logger(__name__)
+
+# Longest side of a preview, in pixels
+DEFAULT_PREVIEW_SIZE = 1024
+
+# GDAL block cache while downsampling a raster without overviews
+_READ_CACHE_MB = 32
+
+# Water, vegetation and urban (the index-based labels), then further classes;
+# class values beyond the list reuse it cyclically
+DEFAULT_PALETTE = [
+    (31, 120, 180),
+    (51, 160, 44),
+    (215, 48, 39),
+    (255, 127, 0),
+    (106, 61, 154),
+    (177, 89, 40),
+    (166, 206, 227),
+    (178, 223, 138),
+    (251, 154, 153),
+    (253, 191, 111),
+]
+
+
+def get_colormap(
+    palette: Optional[Sequence[Tuple[int, int, int]]] = None,
+    nodata: int = CLASS_NODATA,
+) -> Dict[int, Tuple[int, int, int, int]]:
+    """Return an RGBA colormap of all 256 class values; *nodata* is transparent."""
+    palette = palette or DEFAULT_PALETTE
+    colormap = {value: (*palette[value % len(palette)], 255) for value in range(256)}
+    colormap[nodata] = (0, 0, 0, 0)
+    return colormap
+
+
+def render_preview(
+    classified_path: str,
+    output_path: str,
+    max_size: int = DEFAULT_PREVIEW_SIZE,
+    palette: Optional[Sequence[Tuple[int, int, int]]] = None,
+    resampling: Resampling = Resampling.mode,
+) -> Tuple[int, int]:
+    """Render a classified raster as a paletted PNG at most *max_size* pixels across.
+
+    The raster is read decimated, so GDAL serves it from the closest internal
+    overview when there is one (``ClassifiedRasterWriter`` output has them)
+    and otherwise downsamples block by block; memory is bounded by the
+    preview size and a small block cache either way. Use ``mode`` or
+    ``nearest`` *resampling* for class labels. Returns the preview
+    (height, width).
+    """
+    with (
+        rasterio.Env(GDAL_CACHEMAX=_READ_CACHE_MB),
+        rasterio.open(classified_path) as src,
+    ):
+        scale = max(src.width, src.height) / max_size
+        if scale > 1:
+            out_shape = (
+                max(1, round(src.height / scale)),
+                max(1, round(src.width / scale)),
+            )
+        else:
+            out_shape = (src.height, src.width)
+        labels = src.read(1, out_shape=out_shape, resampling=resampling)
+        nodata = CLASS_NODATA if src.nodata is None else int(src.nodata)
+
+    # A plain image: no georeferencing and no .aux.xml sidecar next to the PNG
+    with rasterio.Env(GDAL_PAM_ENABLED="NO"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with rasterio.open(
+            output_path,
+            "w",
+            driver="PNG",
+            width=out_shape[1],
+            height=out_shape[0],
+            count=1,
+            dtype="uint8",
+            nodata=nodata,
+        ) as dst:
+            dst.write(labels.astype("uint8", copy=False), 1)
+            dst.write_colormap(1, get_colormap(palette, nodata))
+
+    logger.info(
+        f"Preview {out_shape[1]}x{out_shape[0]} of {classified_path} saved to "
+        f"{output_path}"
+    )
+    return out_shape
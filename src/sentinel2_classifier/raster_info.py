@@ -1,9 +1,22 @@
+import glob
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
 import rasterio
 
 from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# File extensions picked up when walking directories (SAFE products included)
+RASTER_EXTENSIONS = (".jp2", ".tif", ".tiff", ".vrt", ".img")
+
+# Bumped when the cached record layout changes
+CATALOG_VERSION = 2
+
 
 def get_raster_info(image_path: str) -> dict:
     """Get comprehensive raster information."""
@@ -30,3 +43,122 @@ def print_raster_info(image_path: str) -> None:
     logger.info(f"CRS: {info['crs']}")
     logger.info(f"Bounds: {info['bounds']}")
     logger.info(f"NoData: {info['nodata']}")
+
+
+def _expand_paths(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Return the sorted raster paths under *paths* and the entries that found none."""
+    found = set()
+    empty = []
+    for path in paths:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+        path_found = set()
+        for match in matches:
+            if not os.path.isdir(match):
+                path_found.add(os.path.abspath(match))
+                continue
+            for root, _, files in os.walk(match):
+                path_found.update(
+                    os.path.abspath(os.path.join(root, name))
+                    for name in files
+                    if name.lower().endswith(RASTER_EXTENSIONS)
+                )
+        if not path_found:
+            empty.append(path)
+        found |= path_found
+    return sorted(found), empty
+
+
+def find_rasters(paths: Iterable[str]) -> List[str]:
+    """Expand files, glob patterns and directories into sorted absolute raster paths.
+
+    Directories (e.g. SAFE products) are walked recursively for files with a
+    ``RASTER_EXTENSIONS`` extension; files and glob matches are kept as given.
+    Patterns and directories that yield nothing are skipped; ``scan_rasters``
+    reports them.
+    """
+    return _expand_paths(paths)[0]
+
+
+def _catalog_record(path: str, mtime_ns: int) -> dict:
+    """Read the ``get_raster_info`` fields of *path* as a JSON-compatible record."""
+    record = {"path": path, "mtime_ns": mtime_ns}
+    try:
+        info = get_raster_info(path)
+    except OSError as e:  # Includes RasterioIOError
+        record["error"] = str(e)
+        return record
+    info["transform"] = list(info["transform"])[:6]
+    info["bounds"] = list(info["bounds"])
+    # JSON has no NaN or infinity, so such nodata values are kept as "nan", "inf"
+    if info["nodata"] is not None and not math.isfinite(info["nodata"]):
+        info["nodata"] = str(info["nodata"])
+    record.update(info)
+    return record
+
+
+def scan_rasters(
+    paths: Iterable[str],
+    max_workers: Optional[int] = None,
+    index_path: Optional[str] = None,
+) -> List[dict]:
+    """Collect the metadata of every raster under *paths* using a thread pool.
+
+    *paths* may mix files, glob patterns and directories (see
+    ``find_rasters``). Returns one record per raster with its path, mtime and
+    ``get_raster_info`` fields (transform and bounds as lists, non-finite
+    nodata as a string), or an ``error`` if it could not be opened. Patterns
+    and directories without any raster come first, as error records whose
+    ``path`` is the pattern. When *index_path* is given, rasters whose mtime
+    is unchanged since the previous scan are served from that JSON index
+    instead of being reopened; failed reads are retried next time.
+    """
+    raster_paths, empty = _expand_paths(paths)
+
+    index = {}
+    if index_path and os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            catalog = json.load(f)
+        if catalog.get("version") == CATALOG_VERSION:
+            index = catalog["rasters"]
+
+    records = {}
+    stale = []
+    for path in raster_paths:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            records[path] = {"path": path, "mtime_ns": None, "error": str(e)}
+            continue
+        entry = index.get(path)
+        if entry is not None and entry["mtime_ns"] == mtime_ns:
+            records[path] = entry
+        else:
+            stale.append((path, mtime_ns))
+
+    # Opening a raster is mostly I/O and GDAL work that releases the GIL
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for record in executor.map(lambda item: _catalog_record(*item), stale):
+            records[record["path"]] = record
+    logger.debug(
+        f"Scanned {len(raster_paths)} rasters "
+        f"({len(raster_paths) - len(stale)} from index)"
+    )
+
+    if index_path:
+        # Keep entries of other scans whose files still exist
+        index = {path: entry for path, entry in index.items() if os.path.exists(path)}
+        index.update(
+            (path, record) for path, record in records.items() if "error" not in record
+        )
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": CATALOG_VERSION, "rasters": index}, f, allow_nan=False
+            )
+        os.replace(tmp_path, index_path)
+
+    unmatched = [
+        {"path": path, "mtime_ns": None, "error": "No rasters match this path"}
+        for path in empty
+    ]
+    return unmatched + [records[path] for path in raster_paths]
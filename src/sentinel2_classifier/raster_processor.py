@@ -1,10 +1,155 @@
+import os
+from typing import List, Optional
+
 import numpy as np
 import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from rasterio.windows import Window
 
 from .logging_config import get_logger
+from .masking import CLASS_NODATA
 
 logger = get_logger(__name__)
 
+# Tile size of classification rasters and their overviews
+DEFAULT_BLOCKSIZE = 512
+
+
+def get_classified_profile(
+    source_profile: dict,
+    nodata: int = CLASS_NODATA,
+    blocksize: int = DEFAULT_BLOCKSIZE,
+    num_threads: str = "ALL_CPUS",
+) -> dict:
+    """Return the GeoTIFF profile of a classification of *source_profile*'s grid.
+
+    Tiled, LZW with horizontal predictor, compressed on *num_threads* threads,
+    and BigTIFF whenever the uncompressed size could exceed 4 GB.
+    """
+    return {
+        "driver": "GTiff",
+        "dtype": "uint8",
+        "count": 1,
+        "width": source_profile["width"],
+        "height": source_profile["height"],
+        "crs": source_profile.get("crs"),
+        "transform": source_profile["transform"],
+        "nodata": nodata,
+        "compress": "lzw",
+        "predictor": 2,
+        "tiled": True,
+        "blockxsize": blocksize,
+        "blockysize": blocksize,
+        "num_threads": num_threads,
+        "bigtiff": "IF_SAFER",
+    }
+
+
+def overview_factors(height: int, width: int, blocksize: int) -> List[int]:
+    """Return the decimation factors (2, 4, ...) down to one tile across."""
+    factors = []
+    factor = 2
+    while max(height, width) / (factor // 2) > blocksize:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+class ClassifiedRasterWriter:
+    """Tiled, Cloud-Optimized GeoTIFF writer for classification rasters.
+
+    Label blocks are written window by window (in any order) into a tiled
+    staging GeoTIFF next to *output_path*. On ``close`` it is copied into
+    COG layout (overviews ahead of full-resolution tiles) with internal
+    overviews built by *resampling*, which should be ``mode`` or ``nearest``
+    for class labels. With ``cog=False`` the file is written in place and the
+    overviews are appended to it instead. Use as a context manager; the
+    output is discarded if the block raises.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        source_profile: dict,
+        nodata: int = CLASS_NODATA,
+        blocksize: int = DEFAULT_BLOCKSIZE,
+        overviews: bool = True,
+        resampling: Resampling = Resampling.mode,
+        cog: bool = True,
+        num_threads: str = "ALL_CPUS",
+    ):
+        self.output_path = output_path
+        self.profile = get_classified_profile(
+            source_profile, nodata, blocksize, num_threads
+        )
+        self.overviews = overviews
+        self.resampling = resampling
+        self.cog = cog
+        self._path = f"{output_path}.partial.tif" if cog else output_path
+        self._dst = None
+
+    def open(self) -> "ClassifiedRasterWriter":
+        self._dst = rasterio.open(self._path, "w", **self.profile)
+        return self
+
+    def write(self, labels: np.ndarray, window: Optional[Window] = None) -> None:
+        """Write a (rows x cols) label block at *window* (default: the full grid)."""
+        self._dst.write(labels.astype("uint8", copy=False), 1, window=window)
+
+    def close(self) -> None:
+        """Build the overviews and finish the output file."""
+        factors = (
+            overview_factors(
+                self.profile["height"],
+                self.profile["width"],
+                self.profile["blockxsize"],
+            )
+            if self.overviews
+            else []
+        )
+        if not self.cog:
+            if factors:
+                self._dst.build_overviews(factors, self.resampling)
+                self._dst.update_tags(
+                    ns="rio_overview", resampling=self.resampling.name
+                )
+            self._dst.close()
+            return
+
+        self._dst.close()
+        try:
+            # The COG driver builds the overviews and orders the file for
+            # range requests; the staging file is read once more
+            rasterio.shutil.copy(
+                self._path,
+                self.output_path,
+                driver="COG",
+                compress="LZW",
+                predictor="YES",
+                blocksize=self.profile["blockxsize"],
+                num_threads=self.profile["num_threads"],
+                bigtiff="IF_SAFER",
+                overviews="AUTO" if factors else "NONE",
+                overview_resampling=self.resampling.name.upper(),
+            )
+        finally:
+            os.remove(self._path)
+
+    def abort(self) -> None:
+        """Close and delete everything written so far."""
+        self._dst.close()
+        os.remove(self._path)
+
+    def __enter__(self) -> "ClassifiedRasterWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
 
 def save_classified_raster(
     predictions: np.ndarray,
@@ -12,28 +157,33 @@ def save_classified_raster(
     output_path: str,
     height: int,
     width: int,
+    nodata: int = CLASS_NODATA,
 ) -> None:
-    """Save classification results as a GeoTIFF raster."""
-    logger.info(f"Saving classified raster to {output_path}")
-    classified_image = predictions.reshape(height, width)
-
-    profile = original_profile.copy()
-    profile.update({"dtype": "uint8", "count": 1, "compress": "lzw"})
+    """Save classification results as a tiled GeoTIFF with overviews.
 
-    with rasterio.open(output_path, "w", **profile) as dst:
-        dst.write(classified_image.astype("uint8"), 1)
+    Unclassified pixels are expected to hold *nodata* (see ``valid_mask`` in
+    ``Sentinel2Classifier.predict``), which is recorded in the raster.
+    """
+    logger.info(f"Saving classified raster to {output_path}")
+    profile = {**original_profile, "height": height, "width": width}
+    with ClassifiedRasterWriter(output_path, profile, nodata) as writer:
+        writer.write(predictions.reshape(height, width))
     logger.info("Classified raster saved successfully")
 
 
 def visualize_classification(
     classified_image: np.ndarray, output_path: str = None
 ) -> None:
-    """Create a simple visualization of the classification."""
+    """Create a simple visualization of the classification.
+
+    Draws the full array with matplotlib; for whole tiles or headless runs use
+    ``preview.render_preview`` on the saved raster instead.
+    """
     import matplotlib.pyplot as plt
 
     logger.info("Creating classification visualization")
     plt.figure(figsize=(10, 8))
-    plt.imshow(classified_image, cmap="viridis")
+    plt.imshow(np.ma.masked_equal(classified_image, CLASS_NODATA), cmap="viridis")
     plt.colorbar(label="Land Cover Class")
     plt.title("Sentinel-2 Classification Results")
 
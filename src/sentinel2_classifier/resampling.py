@@ -1,10 +1,26 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import rasterio
-
+from affine import Affine
+from rasterio.enums import Resampling
+from rasterio.transform import array_bounds
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+from rasterio.windows import union as window_union
+
+from .band_cache import BandCache, get_default_cache
+from .features import build_features
 from .geospatial_utils import (
-    crop_multispectral_data,
+    RoiIndex,
+    get_bounds_window,
+    get_geometry_mask,
+    get_geometry_window,
+    get_roi_geometries,
     load_geojson,
     validate_and_transform_crs,
 )
@@ -102,49 +118,474 @@ def filter_paths_by_resolution(
     return {band: path for band, path in band_paths.items() if band in allowed_bands}
 
 
+# ----------------------------------------------------------------------
+# 6️⃣  Categorical bands are never interpolated
+# ----------------------------------------------------------------------
+categorical_bands = {"SCL"}
+
+
+def get_resampling_method(
+    band: str, native_resolution: float, target_resolution: int, upsampling: str
+) -> Resampling:
+    """Pick the resampling kernel used to bring *band* to *target_resolution*."""
+    if native_resolution == target_resolution:
+        return Resampling.nearest
+    if band in categorical_bands:
+        # Class codes must stay valid codes
+        if native_resolution < target_resolution:
+            return Resampling.mode
+        return Resampling.nearest
+    if native_resolution < target_resolution:
+        # Block average of the finer pixels (nodata pixels are skipped)
+        return Resampling.average
+    return Resampling[upsampling]
+
+
+def get_target_grid(profiles: List[dict], target_resolution: int) -> dict:
+    """Return the profile of the output grid at *target_resolution*.
+
+    The grid is aligned to a band stored natively at the target resolution when
+    one is available, otherwise to the first band rescaled to the target.
+    """
+    for profile in profiles:
+        if profile["transform"].a == target_resolution:
+            return profile.copy()
+
+    ref_profile = profiles[0]
+    ref_transform = ref_profile["transform"]
+    scale = ref_transform.a / target_resolution
+    grid_profile = ref_profile.copy()
+    grid_profile.update(
+        {
+            "width": int(round(ref_profile["width"] * scale)),
+            "height": int(round(ref_profile["height"] * scale)),
+            "transform": Affine(
+                target_resolution,
+                0.0,
+                ref_transform.c,
+                0.0,
+                -target_resolution,
+                ref_transform.f,
+            ),
+        }
+    )
+    return grid_profile
+
+
+# Source pixels read per strip when block-averaging a band
+_AVERAGE_STRIP_PIXELS = 1 << 22
+
+
+def _read_average(src, src_window: Window, out: np.ndarray, nodata: float) -> bool:
+    """Block-average *src_window* of band 1 onto *out*, skipping *nodata* pixels.
+
+    Handles integer, pixel-aligned reductions (as between Sentinel-2 grids) and
+    returns False for anything else. Output pixels without a valid source
+    pixel are set to *nodata*.
+    """
+    rows, cols = out.shape
+    values = np.array(
+        [src_window.col_off, src_window.row_off, src_window.width, src_window.height]
+    )
+    col_off, row_off, width, height = np.round(values).astype(int)
+    factor = height // rows
+    if (
+        not np.allclose(values, np.round(values), atol=1e-6)
+        or factor < 1
+        or (height, width) != (rows * factor, cols * factor)
+        or min(col_off, row_off) < 0
+        or row_off + height > src.height
+        or col_off + width > src.width
+    ):
+        return False
+
+    # Read full-resolution strips so memory stays bounded
+    strip_rows = max(1, _AVERAGE_STRIP_PIXELS // (width * factor))
+    for start in range(0, rows, strip_rows):
+        stop = min(start + strip_rows, rows)
+        strip = Window(
+            col_off, row_off + start * factor, width, (stop - start) * factor
+        )
+        block = src.read(1, window=strip).reshape(stop - start, factor, cols, factor)
+        valid = ~np.isnan(block) if np.isnan(nodata) else block != nodata
+        counts = valid.sum(axis=(1, 3))
+        sums = np.where(valid, block, 0).sum(axis=(1, 3), dtype=np.float64)
+        mean = sums / np.maximum(counts, 1)
+        if np.issubdtype(out.dtype, np.integer):
+            mean = np.floor(mean + 0.5)  # Round half up, as GDAL does
+        out[start:stop] = np.where(counts > 0, mean, nodata)
+    return True
+
+
+def _get_band_profile(path: str) -> dict:
+    """Return the profile of *path* without decoding any pixels."""
+    with rasterio.open(path) as src:
+        return src.profile
+
+
+def _decode_band(
+    path: str,
+    bounds: Tuple[float, float, float, float],
+    out: np.ndarray,
+    resampling,
+    cache: Optional[BandCache] = None,
+) -> float:
+    """Decode the area *bounds* of band 1 of *path* into *out*, resampling on read.
+
+    The source window may be fractional; GDAL resamples it straight onto the
+    shape of *out*, so no full-resolution intermediate copy is made. Average
+    reductions skip nodata pixels (the file's nodata value, else 0) and run
+    strip by strip in NumPy when the scale factor is an integer. When a cache
+    is given, previously decoded windows are copied from it instead.
+    """
+    start = time.perf_counter()
+    if cache is not None:
+        key = cache.make_key(
+            path,
+            bounds=bounds,
+            shape=out.shape,
+            dtype=str(out.dtype),
+            resampling=resampling.name,
+            skip_nodata=resampling == Resampling.average,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            out[...] = cached
+            return time.perf_counter() - start
+
+    with rasterio.open(path) as src:
+        src_window = from_bounds(*bounds, transform=src.transform)
+        nodata = src.nodata if src.nodata is not None else 0
+        if resampling != Resampling.average or not _read_average(
+            src, src_window, out, nodata
+        ):
+            src.read(1, window=src_window, out=out, resampling=resampling)
+
+    if cache is not None:
+        cache.put(key, out)
+    return time.perf_counter() - start
+
+
+def _decode_bands(
+    executor: ThreadPoolExecutor,
+    band_names: List[str],
+    band_files: List[str],
+    band_profiles: List[dict],
+    ref_profile: dict,
+    window: Window,
+    target_resolution: int,
+    upsampling: str,
+    cache: Optional[BandCache],
+    max_workers: int,
+) -> np.ndarray:
+    """Decode *window* of the target grid of every band into one (bands, rows, cols) cube."""
+    resampling_methods = [
+        get_resampling_method(
+            band_name, profile["transform"].a, target_resolution, upsampling
+        )
+        for band_name, profile in zip(band_names, band_profiles)
+    ]
+
+    # Preallocate the output cube; each band is decoded straight into its slot
+    dtype = np.result_type(*[profile["dtype"] for profile in band_profiles])
+    stacked_data = np.empty(
+        (len(band_names), int(window.height), int(window.width)), dtype=dtype
+    )
+
+    start = time.perf_counter()
+    decode_times = list(
+        executor.map(
+            _decode_band,
+            band_files,
+            [window_bounds(window, ref_profile["transform"])] * len(band_files),
+            list(stacked_data),
+            resampling_methods,
+            [cache] * len(band_files),
+        )
+    )
+
+    for band_name, profile, method, seconds in zip(
+        band_names, band_profiles, resampling_methods, decode_times
+    ):
+        logger.info(
+            f"Decoded {band_name} ({profile['transform'].a:g}m -> "
+            f"{target_resolution}m, {method.name}) in {seconds:.2f}s"
+        )
+    logger.info(
+        f"Decoded {len(band_names)} bands in {time.perf_counter() - start:.2f}s "
+        f"using {max_workers} threads"
+    )
+    return stacked_data
+
+
 def resample_sentinel2_bands(
     band_paths: Dict[str, str],
     target_resolution: int = 10,
     geojson_path: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
 ) -> Tuple[np.ndarray, dict]:
-    """Load bands at target resolution only (no resampling for now)."""
+    """Load bands and resample them onto a common grid at target resolution.
 
-    # Filter bands to only those at target resolution
-    target_bands = filter_paths_by_resolution(band_paths, target_resolution)
+    Coarser bands are upsampled with *upsampling* (``nearest``, ``bilinear`` or
+    ``cubic``), finer bands are downsampled with an average that skips nodata, and
+    categorical bands (SCL) use nearest/mode. All bands are aligned to the grid
+    of the reference band.
 
-    if not target_bands:
-        raise ValueError(f"No bands found at {target_resolution}m resolution")
+    Bands are decoded concurrently by a pool of *max_workers* threads (default:
+    one per band, capped at the CPU count); GDAL releases the GIL while decoding.
+    Decoded windows are kept in *cache* (default: the band cache from
+    ``get_default_cache``), so repeated loads skip JP2 decoding.
+    """
+    if not band_paths:
+        raise ValueError(f"No bands found for {target_resolution}m resolution")
+
+    if cache is None:
+        cache = get_default_cache()
+
+    band_names = sorted(band_paths.keys())
+    band_files = [band_paths[band_name] for band_name in band_names]
+
+    if max_workers is None:
+        max_workers = min(len(band_names), os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        band_profiles = list(executor.map(_get_band_profile, band_files))
+        ref_profile = get_target_grid(band_profiles, target_resolution)
+
+        # Resolve the GeoJSON ROI to a pixel window so only that part is decoded
+        window = Window(0, 0, ref_profile["width"], ref_profile["height"])
+        geometries = None
+        if geojson_path:
+            geojson = load_geojson(geojson_path)
+            logger.debug(f"Loaded GeoJSON: {geojson}")
+            geojson = validate_and_transform_crs(geojson, str(ref_profile["crs"]))
+            logger.debug(f"Validated GeoJSON: {geojson}")
+            geometries = get_roi_geometries(geojson)
+            window = get_geometry_window(
+                geometries,
+                ref_profile["transform"],
+                ref_profile["width"],
+                ref_profile["height"],
+            )
+            logger.info(f"Reading ROI window {window}")
+
+        stacked_data = _decode_bands(
+            executor,
+            band_names,
+            band_files,
+            band_profiles,
+            ref_profile,
+            window,
+            target_resolution,
+            upsampling,
+            cache,
+            max_workers,
+        )
 
-    # Get reference band for profile
-    ref_band = next(iter(target_bands.keys()))
+    # Update profile
+    output_profile = ref_profile.copy()
+    # Sentinel-2 digital number 0 is NO_DATA
+    output_profile.update(
+        {"count": len(band_names), "dtype": stacked_data.dtype, "nodata": 0}
+    )
 
-    with rasterio.open(target_bands[ref_band]) as ref_src:
-        ref_profile = ref_src.profile
+    # Blank pixels outside the polygon, as rasterio.mask would
+    if geometries is not None:
+        inside = get_geometry_mask(geometries, window, ref_profile["transform"])
+        stacked_data[:, ~inside] = 0
+        output_profile.update(
+            {
+                "driver": "GTiff",
+                "height": stacked_data.shape[1],
+                "width": stacked_data.shape[2],
+                "transform": window_transform(window, ref_profile["transform"]),
+            }
+        )
 
-    bands_data = []
+    return stacked_data, output_profile
 
-    for band_name in sorted(target_bands.keys()):
-        with rasterio.open(target_bands[band_name]) as src:
-            bands_data.append(src.read(1))
 
-    # Stack bands
-    stacked_data = np.stack(bands_data, axis=0)
+def resample_sentinel2_rois(
+    band_paths: Dict[str, str],
+    geojson_path: str,
+    target_resolution: int = 10,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
+) -> List[Tuple[dict, np.ndarray, dict]]:
+    """Resample bands once for every feature of a GeoJSON FeatureCollection.
+
+    Features overlapping the scene are found with a ``RoiIndex`` of their
+    bounding boxes. The union of their windows is decoded once per band, then
+    each feature gets a copy of its own window with pixels outside it set to 0,
+    as ``resample_sentinel2_bands`` returns for a single-polygon GeoJSON.
+    Returns ``(feature, data, profile)`` per overlapping feature, in file order.
+    """
+    if not band_paths:
+        raise ValueError(f"No bands found for {target_resolution}m resolution")
 
-    # Update profile
-    output_profile = ref_profile.copy()
-    output_profile.update({"count": len(bands_data), "dtype": stacked_data.dtype})
-
-    # Apply GeoJSON cropping if provided
-    if geojson_path:
-        geojson = load_geojson(geojson_path)
-        logger.debug(f"Loaded GeoJSON: {geojson}")
-        geojson = validate_and_transform_crs(geojson, str(ref_profile["crs"]))
-        logger.debug(f"Validated GeoJSON: {geojson}")
-        stacked_data, output_profile = crop_multispectral_data(
-            stacked_data, output_profile, geojson
+    if cache is None:
+        cache = get_default_cache()
+
+    band_names = sorted(band_paths.keys())
+    band_files = [band_paths[band_name] for band_name in band_names]
+
+    if max_workers is None:
+        max_workers = min(len(band_names), os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        band_profiles = list(executor.map(_get_band_profile, band_files))
+        ref_profile = get_target_grid(band_profiles, target_resolution)
+        transform = ref_profile["transform"]
+        height, width = ref_profile["height"], ref_profile["width"]
+
+        geojson = validate_and_transform_crs(
+            load_geojson(geojson_path), str(ref_profile["crs"])
+        )
+        index = RoiIndex(geojson)
+        selected = index.query(array_bounds(height, width, transform))
+        if not len(selected):
+            raise ValueError("Input shapes do not overlap raster.")
+        windows = [
+            get_bounds_window(index.bounds[i], transform, width, height)
+            for i in selected
+        ]
+        union = window_union(*windows)
+        logger.info(
+            f"Reading union window {union} of {len(selected)} of "
+            f"{len(index)} ROI features"
         )
 
-    return stacked_data, output_profile
+        stacked_data = _decode_bands(
+            executor,
+            band_names,
+            band_files,
+            band_profiles,
+            ref_profile,
+            union,
+            target_resolution,
+            upsampling,
+            cache,
+            max_workers,
+        )
+
+    rois = []
+    for i, window in zip(selected, windows):
+        feature = index.features[i]
+        row_off = int(window.row_off - union.row_off)
+        col_off = int(window.col_off - union.col_off)
+        data = stacked_data[
+            :,
+            row_off : row_off + int(window.height),
+            col_off : col_off + int(window.width),
+        ].copy()
+        inside = get_geometry_mask([feature["geometry"]], window, transform)
+        data[:, ~inside] = 0
+
+        profile = ref_profile.copy()
+        # Sentinel-2 digital number 0 is NO_DATA
+        profile.update(
+            {
+                "driver": "GTiff",
+                "count": len(band_names),
+                "dtype": data.dtype,
+                "nodata": 0,
+                "height": data.shape[1],
+                "width": data.shape[2],
+                "transform": window_transform(window, transform),
+            }
+        )
+        rois.append((feature, data, profile))
+    return rois
+
+
+class ResampledBandReader:
+    """Read windows of several band files resampled onto one target grid.
+
+    Bands keep the order of *band_paths* and are brought to
+    *target_resolution* with the grid and kernels of
+    ``resample_sentinel2_bands``, one window at a time, so a scene can be
+    streamed in bounded memory. With *geojson_path*, the grid is cropped to
+    the ROI window of the first feature and pixels outside the polygon read
+    as 0. ``profile`` describes the grid that windows refer to.
+    """
+
+    def __init__(
+        self,
+        band_paths: Dict[str, str],
+        target_resolution: int,
+        geojson_path: Optional[str] = None,
+        upsampling: str = "bilinear",
+    ):
+        if not band_paths:
+            raise ValueError(f"No bands found for {target_resolution}m resolution")
+        self.band_names = list(band_paths)
+        self.band_files = [band_paths[band_name] for band_name in self.band_names]
+        band_profiles = [_get_band_profile(path) for path in self.band_files]
+        grid = get_target_grid(band_profiles, target_resolution)
+        self.resampling_methods = [
+            get_resampling_method(
+                band_name, profile["transform"].a, target_resolution, upsampling
+            )
+            for band_name, profile in zip(self.band_names, band_profiles)
+        ]
+        self.dtype = np.result_type(*[profile["dtype"] for profile in band_profiles])
+
+        window = Window(0, 0, grid["width"], grid["height"])
+        self.geometries = None
+        if geojson_path:
+            geojson = validate_and_transform_crs(
+                load_geojson(geojson_path), str(grid["crs"])
+            )
+            self.geometries = get_roi_geometries(geojson)
+            window = get_geometry_window(
+                self.geometries, grid["transform"], grid["width"], grid["height"]
+            )
+
+        # Sentinel-2 digital number 0 is NO_DATA
+        self.profile = grid.copy()
+        self.profile.update(
+            {
+                "count": len(self.band_names),
+                "dtype": self.dtype,
+                "nodata": 0,
+                "height": int(window.height),
+                "width": int(window.width),
+                "transform": window_transform(window, grid["transform"]),
+            }
+        )
+
+    def read(
+        self, window: Window, executor: Optional[ThreadPoolExecutor] = None
+    ) -> np.ndarray:
+        """Decode *window* of every band into a (bands, rows, cols) cube.
+
+        Bands are decoded concurrently when an *executor* is given.
+        """
+        data = np.empty(
+            (len(self.band_names), int(window.height), int(window.width)),
+            dtype=self.dtype,
+        )
+        bounds = window_bounds(window, self.profile["transform"])
+        decode_map = executor.map if executor is not None else map
+        # Each band is resampled on read straight into its slot
+        list(
+            decode_map(
+                _decode_band,
+                self.band_files,
+                [bounds] * len(self.band_files),
+                list(data),
+                self.resampling_methods,
+            )
+        )
+        if self.geometries is not None:
+            inside = get_geometry_mask(
+                self.geometries, window, self.profile["transform"]
+            )
+            data[:, ~inside] = 0
+        return data
 
 
 def load_sentinel2_safe_folder(
@@ -152,85 +593,49 @@ def load_sentinel2_safe_folder(
     target_resolution: int = 10,
     selected_bands: List[str] = None,
     geojson_path: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
 ) -> Tuple[np.ndarray, dict]:
-    """Load Sentinel-2 SAFE folder, use only bands at target resolution."""
-    from pathlib import Path
-
-    # Define bands available at each resolution
-    resolution_bands = {
-        10: ["AOT", "B02", "B03", "B04", "B08", "TCI", "WVP"],
-        20: [
-            "AOT",
-            "B01",
-            "B02",
-            "B03",
-            "B04",
-            "B05",
-            "B06",
-            "B07",
-            "B11",
-            "B12",
-            "B8A",
-            "SCL",
-            "TCI",
-            "WVP",
-        ],
-        60: [
-            "AOT",
-            "B01",
-            "B02",
-            "B03",
-            "B04",
-            "B05",
-            "B06",
-            "B07",
-            "B09",
-            "B11",
-            "B12",
-            "B8A",
-            "SCL",
-            "TCI",
-            "WVP",
-        ],
-    }
-    print(selected_bands)
+    """Load Sentinel-2 SAFE folder, resampling every selected band to target resolution."""
+    from .safe_product import load_safe_product
+
     if selected_bands is None:
-        selected_bands = resolution_bands[target_resolution]
-    else:
-        # Filter selected bands to only those available at target resolution
-        available_bands = resolution_bands[target_resolution]
-        selected_bands = [band for band in selected_bands if band in available_bands]
-    print(selected_bands)
-    # Find band files in SAFE folder
-    safe_path = Path(safe_folder)
-    img_folder = (
-        safe_path / "GRANULE" / next(safe_path.glob("GRANULE/*")).name / "IMG_DATA"
+        selected_bands = get_bands_for_resolution(target_resolution)
+
+    # Each band is read from its file at the target resolution, if the product
+    # has one, otherwise from its native (finest) file, in the first granule
+    product = load_safe_product(safe_folder)
+    band_paths = product.get_band_paths(selected_bands, target_resolution)
+    logger.debug(f"Band files: {band_paths}")
+
+    return resample_sentinel2_bands(
+        band_paths, target_resolution, geojson_path, max_workers, upsampling, cache
     )
 
-    band_paths = {}
 
-    # Handle L1C vs L2A structure
-    if (img_folder / "R10m").exists():  # L2A
-        res_folder = f"R{target_resolution}m"
-        res_path = img_folder / res_folder
+def load_sentinel2_safe_folder_rois(
+    safe_folder: str,
+    geojson_path: str,
+    target_resolution: int = 10,
+    selected_bands: List[str] = None,
+    max_workers: Optional[int] = None,
+    upsampling: str = "bilinear",
+    cache: Optional[BandCache] = None,
+) -> List[Tuple[dict, np.ndarray, dict]]:
+    """Load one cropped cube per GeoJSON feature from a single decode of a SAFE folder."""
+    from .safe_product import load_safe_product
+
+    if selected_bands is None:
+        selected_bands = get_bands_for_resolution(target_resolution)
 
-        if res_path.exists():
-            for band_file in res_path.glob("*.jp2"):
-                print(f"{band_file.name}")
-                for band in selected_bands:
-                    print(f"_{band}_  <=> {band_file.name}")
-                    if f"_{band}_" in band_file.name:
-                        print("Valid")
-                        band_paths[band] = str(band_file)
-                        break
-    else:  # L1C
-        for band_file in img_folder.glob("*.jp2"):
-            for band in selected_bands:
-                if f"_{band}_" in band_file.name:
-                    band_paths[band] = str(band_file)
-                    break
+    product = load_safe_product(safe_folder)
+    band_paths = product.get_band_paths(selected_bands, target_resolution)
+    logger.debug(f"Band files: {band_paths}")
 
-    return resample_sentinel2_bands(band_paths, target_resolution, geojson_path)
+    return resample_sentinel2_rois(
+        band_paths, geojson_path, target_resolution, max_workers, upsampling, cache
+    )
 
 
 def create_common_resolution_dataset(
@@ -240,5 +645,4 @@ def create_common_resolution_dataset(
     if target_bands is not None:
         band_data = band_data[target_bands]
 
-    bands, height, width = band_data.shape
-    return band_data.reshape(bands, -1).T
+    return build_features(band_data, dtype=band_data.dtype)
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .logging_config import get_logger
+from .resampling import band_resolutions
+
+logger = get_logger(__name__)
+
+# L2A: T14QMG_20250813T165911_B03_10m.jp2, L1C: T14QMG_20250813T165911_B03.jp2
+_BAND_FILE_PATTERN = re.compile(
+    r"_(?P<band>B\d[\dA]|AOT|WVP|TCI|SCL)(?:_(?P<resolution>\d+)m)?\.jp2$"
+)
+
+# Auxiliary L1C/L2A products that are not in band_resolutions
+_AUXILIARY_RESOLUTIONS = {"AOT": 10, "WVP": 10, "TCI": 10, "SCL": 20}
+
+
+class SafeProduct:
+    """Index of the band files of a Sentinel-2 SAFE product.
+
+    Maps granule -> band -> native/available resolution -> file path, parsed
+    once from the folder layout (L1C and L2A).
+    """
+
+    def __init__(self, path: str, level: str, granules: Dict[str, dict]):
+        self.path = path
+        self.level = level
+        self.granules = granules
+
+    @classmethod
+    def from_path(cls, safe_folder: str) -> "SafeProduct":
+        """Parse the SAFE folder layout into an index."""
+        safe_folder = os.path.abspath(safe_folder)
+        granule_root = os.path.join(safe_folder, "GRANULE")
+        granules = {}
+        level = "L1C"
+
+        for granule in sorted(os.scandir(granule_root), key=lambda e: e.name):
+            if not granule.is_dir():
+                continue
+            img_folder = os.path.join(granule.path, "IMG_DATA")
+            bands = {}
+            for entry in os.scandir(img_folder):
+                if entry.is_dir():  # L2A: R10m / R20m / R60m
+                    level = "L2A"
+                    files = list(os.scandir(entry.path))
+                else:  # L1C: files directly in IMG_DATA
+                    files = [entry]
+                for band_file in files:
+                    match = _BAND_FILE_PATTERN.search(band_file.name)
+                    if match is None:
+                        continue
+                    band = match["band"]
+                    resolution = int(match["resolution"] or _native_resolution(band))
+                    bands.setdefault(band, {})[resolution] = os.path.relpath(
+                        band_file.path, safe_folder
+                    )
+            granules[granule.name] = bands
+
+        if not granules:
+            raise FileNotFoundError(f"No granules found in {safe_folder}")
+
+        logger.debug(f"Indexed {level} product {safe_folder}")
+        return cls(safe_folder, level, granules)
+
+    @property
+    def granule_ids(self) -> List[str]:
+        """Return the granule identifiers in sorted order."""
+        return sorted(self.granules)
+
+    def _granule(self, granule: Optional[str]) -> dict:
+        return self.granules[granule if granule is not None else self.granule_ids[0]]
+
+    def bands(self, granule: Optional[str] = None) -> List[str]:
+        """Return the bands available in *granule* (default: first granule)."""
+        return sorted(self._granule(granule))
+
+    def native_resolution(self, band: str, granule: Optional[str] = None) -> int:
+        """Return the finest resolution (m) *band* is stored at."""
+        return min(self._granule(granule)[band])
+
+    def get_band_path(
+        self, band: str, resolution: Optional[int] = None, granule: Optional[str] = None
+    ) -> str:
+        """Return the file for *band*, at *resolution* or at its native resolution."""
+        files = self._granule(granule)[band]
+        if resolution is None:
+            resolution = min(files)
+        return os.path.join(self.path, files[resolution])
+
+    def get_band_paths(
+        self,
+        bands: List[str],
+        resolution: Optional[int] = None,
+        granule: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """Return the file of every requested band present.
+
+        Bands stored at *resolution* use that file; the others (and every band
+        when *resolution* is None) use their native-resolution file.
+        """
+        available = self._granule(granule)
+        return {
+            band: self.get_band_path(
+                band,
+                resolution if resolution in available[band] else None,
+                granule,
+            )
+            for band in bands
+            if band in available
+        }
+
+    def to_dict(self) -> dict:
+        """Serialize the index to JSON-compatible types."""
+        return {"path": self.path, "level": self.level, "granules": self.granules}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SafeProduct":
+        """Rebuild an index produced by :meth:`to_dict`."""
+        granules = {
+            granule: {
+                band: {int(resolution): path for resolution, path in files.items()}
+                for band, files in bands.items()
+            }
+            for granule, bands in data["granules"].items()
+        }
+        return cls(data["path"], data["level"], granules)
+
+
+def _native_resolution(band: str) -> int:
+    return band_resolutions.get(band) or _AUXILIARY_RESOLUTIONS[band]
+
+
+@lru_cache(maxsize=256)
+def _load_safe_product(safe_folder: str, mtime_ns: int) -> SafeProduct:
+    return SafeProduct.from_path(safe_folder)
+
+
+def load_safe_product(safe_folder: str) -> SafeProduct:
+    """Return the index of *safe_folder*, parsed once per process."""
+    safe_folder = os.path.abspath(safe_folder)
+    return _load_safe_product(safe_folder, os.stat(safe_folder).st_mtime_ns)
+
+
+def scan_safe_products(
+    directory: str,
+    max_workers: Optional[int] = None,
+    index_path: Optional[str] = None,
+) -> List[SafeProduct]:
+    """Index every ``*.SAFE`` folder in *directory* using a thread pool.
+
+    When *index_path* is given, products whose folder is unchanged since the
+    previous scan are loaded from that JSON index instead of being re-parsed.
+    """
+    safe_folders = sorted(
+        entry.path
+        for entry in os.scandir(os.path.abspath(directory))
+        if entry.is_dir() and entry.name.endswith(".SAFE")
+    )
+
+    index = {}
+    if index_path and os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+    mtimes = {path: os.stat(path).st_mtime_ns for path in safe_folders}
+    products = {}
+    stale = []
+    for path in safe_folders:
+        entry = index.get(path)
+        if entry is not None and entry["mtime_ns"] == mtimes[path]:
+            products[path] = SafeProduct.from_dict(entry["product"])
+        else:
+            stale.append(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path, product in zip(stale, executor.map(SafeProduct.from_path, stale)):
+            products[path] = product
+    logger.info(
+        f"Indexed {len(safe_folders)} SAFE products "
+        f"({len(safe_folders) - len(stale)} from index)"
+    )
+
+    if index_path:
+        with open(index_path, "w") as f:
+            json.dump(
+                {
+                    path: {"mtime_ns": mtimes[path], "product": product.to_dict()}
+                    for path, product in products.items()
+                },
+                f,
+            )
+
+    return [products[path] for path in safe_folders]
@@ -0,0 +1,133 @@
+from contextlib import ExitStack
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .data_loader import prepare_features
+from .logging_config import get_logger
+from .masking import compute_valid_mask
+
+logger = get_logger(__name__)
+
+
+class StratifiedSampler:
+    """Streaming, class-balanced sampler of training pixels.
+
+    Every pixel gets a random priority and, per class, only the
+    *max_per_class* pixels with the smallest priorities are kept. The result is
+    a uniform random sample of each class over everything seen, reproducible
+    for a given *random_state* and update order, in memory bounded by
+    ``max_per_class x classes``.
+    """
+
+    def __init__(self, max_per_class: int, random_state: Optional[int] = 42):
+        self.max_per_class = max_per_class
+        self._rng = np.random.default_rng(random_state)
+        self._keys = {}
+        self._features = {}
+        self.seen = {}
+
+    def update(self, features: np.ndarray, labels: np.ndarray) -> None:
+        """Offer a batch of (pixels x features) with their labels."""
+        keys = self._rng.random(labels.shape[0])
+        for cls in np.unique(labels):
+            selected = labels == cls
+            cls_keys = keys[selected]
+            cls_features = features[selected]
+            if cls in self._keys:
+                cls_keys = np.concatenate([self._keys[cls], cls_keys])
+                cls_features = np.concatenate([self._features[cls], cls_features])
+            if cls_keys.shape[0] > self.max_per_class:
+                keep = np.argpartition(cls_keys, self.max_per_class)[
+                    : self.max_per_class
+                ]
+                cls_keys = cls_keys[keep]
+                cls_features = cls_features[keep]
+            self._keys[cls] = cls_keys
+            self._features[cls] = cls_features
+            self.seen[cls] = self.seen.get(cls, 0) + int(selected.sum())
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the sampled (features, labels), ordered by class then priority."""
+        features, labels = [], []
+        for cls in sorted(self._keys):
+            order = np.argsort(self._keys[cls], kind="stable")
+            features.append(self._features[cls][order])
+            labels.append(np.full(order.shape[0], cls))
+        if not features:
+            raise ValueError("No samples have been offered to the sampler")
+        logger.info(
+            "Sampled "
+            + ", ".join(
+                f"class {cls}: {self._keys[cls].shape[0]}/{self.seen[cls]}"
+                for cls in sorted(self._keys)
+            )
+        )
+        return np.concatenate(features), np.concatenate(labels)
+
+
+def stratified_sample_indices(
+    labels: np.ndarray, max_per_class: int, random_state: Optional[int] = 42
+) -> np.ndarray:
+    """Return sorted row indices of a class-balanced sample of *labels*."""
+    sampler = StratifiedSampler(max_per_class, random_state)
+    sampler.update(np.arange(labels.shape[0]), labels)
+    indices, _ = sampler.result()
+    return np.sort(indices)
+
+
+def sample_training_pixels(
+    sources: Union[str, Sequence[str]],
+    label_fn: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    max_per_class: int,
+    random_state: Optional[int] = 42,
+    band_order: Optional[List[str]] = None,
+    indices: Sequence[str] = (),
+    memory_budget_mb: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Stream a raster window by window into a stratified training sample.
+
+    ``label_fn(data, valid_mask)`` returns the labels of the valid pixels of a
+    window, e.g. ``create_sample_labels_from_index`` with a fixed band order.
+    The full-scene label array is never materialized.
+    """
+    # streaming imports the classifier, which imports this module
+    from .streaming import (
+        DEFAULT_MEMORY_BUDGET_MB,
+        band_nodata,
+        iter_row_windows,
+        open_band_sources,
+        plan_rows_per_window,
+        read_window,
+    )
+
+    if memory_budget_mb is None:
+        memory_budget_mb = DEFAULT_MEMORY_BUDGET_MB
+
+    sampler = StratifiedSampler(max_per_class, random_state)
+    with ExitStack() as stack:
+        band_sources = open_band_sources(stack, sources)
+        ref = band_sources[0][0]
+        nodata = band_nodata(band_sources)
+        n_features = len(band_sources) + len(indices)
+        # Window, float32 features, labels and sampler keys per pixel
+        bytes_per_pixel = (
+            len(band_sources) * np.dtype(ref.dtypes[0]).itemsize + n_features * 4 + 16
+        )
+        rows_per_window = plan_rows_per_window(
+            ref.height,
+            ref.width,
+            bytes_per_pixel,
+            memory_budget_mb,
+            ref.block_shapes[0][0],
+        )
+
+        for window in iter_row_windows(ref.height, ref.width, rows_per_window):
+            data = read_window(band_sources, window)
+            valid_mask = compute_valid_mask(data, nodata)
+            features = prepare_features(
+                data, band_order=band_order, indices=indices, valid_mask=valid_mask
+            )
+            sampler.update(features, label_fn(data, valid_mask))
+
+    return sampler.result()
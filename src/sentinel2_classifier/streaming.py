@@ -0,0 +1,176 @@
+from contextlib import ExitStack
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from .classifier import Sentinel2Classifier
+from .data_loader import prepare_features
+from .logging_config import get_logger
+from .masking import CLASS_NODATA, compute_valid_mask
+from .raster_processor import ClassifiedRasterWriter
+
+logger = get_logger(__name__)
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Classes assumed when the fitted class count is unknown
+DEFAULT_N_CLASSES = 8
+
+
+def estimate_bytes_per_pixel(n_bands: int, itemsize: int, n_classes: int) -> int:
+    """Estimate peak working memory per pixel for read -> features -> predict."""
+    # Raw window, the float32 copy sklearn makes of the features, float64 class
+    # probabilities (accumulator plus one per-tree temporary), int64 labels and
+    # the uint8 output block.
+    return n_bands * (itemsize + 4) + 2 * n_classes * 8 + 8 + 1
+
+
+def plan_rows_per_window(
+    height: int,
+    width: int,
+    bytes_per_pixel: int,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    block_height: int = 1,
+) -> int:
+    """Return how many full-width rows fit in the memory budget."""
+    budget = int(memory_budget_mb * 1024 * 1024)
+    rows = max(1, budget // (width * bytes_per_pixel))
+    # Keep windows aligned to the source block height so blocks are decoded once
+    if rows > block_height:
+        rows -= rows % block_height
+    return int(min(rows, height))
+
+
+def iter_row_windows(height: int, width: int, rows_per_window: int) -> Iterator[Window]:
+    """Yield full-width row windows covering a raster top to bottom."""
+    for row_off in range(0, height, rows_per_window):
+        yield Window(0, row_off, width, min(rows_per_window, height - row_off))
+
+
+def open_band_sources(
+    stack: ExitStack, sources: Union[str, Sequence[str]]
+) -> List[Tuple[rasterio.io.DatasetReader, int]]:
+    """Open a multi-band raster or a list of single-band rasters as (dataset, band) pairs."""
+    if isinstance(sources, str):
+        src = stack.enter_context(rasterio.open(sources))
+        return [(src, band) for band in range(1, src.count + 1)]
+
+    band_sources = [(stack.enter_context(rasterio.open(path)), 1) for path in sources]
+    ref = band_sources[0][0]
+    for src, _ in band_sources[1:]:
+        if (src.width, src.height) != (ref.width, ref.height):
+            raise ValueError(
+                f"Band {src.name} is {src.width}x{src.height}, "
+                f"expected {ref.width}x{ref.height}"
+            )
+    return band_sources
+
+
+def band_nodata(
+    band_sources: List[Tuple[rasterio.io.DatasetReader, int]],
+) -> List[float]:
+    """Return the nodata value of every band source, 0 (Sentinel-2 NO_DATA) if unset."""
+    values = []
+    for src, band in band_sources:
+        value = src.nodatavals[band - 1]
+        values.append(0 if value is None else value)
+    return values
+
+
+def read_window(
+    band_sources: List[Tuple[rasterio.io.DatasetReader, int]], window: Window
+) -> np.ndarray:
+    """Read one window from every band source into a (bands, rows, cols) array."""
+    ref = band_sources[0][0]
+    data = np.empty(
+        (len(band_sources), int(window.height), int(window.width)),
+        dtype=ref.dtypes[0],
+    )
+    for i, (src, band) in enumerate(band_sources):
+        src.read(band, window=window, out=data[i])
+    return data
+
+
+def classify_window(
+    classifier: Sentinel2Classifier,
+    band_sources: List[Tuple[rasterio.io.DatasetReader, int]],
+    window: Window,
+    nodata: int = CLASS_NODATA,
+) -> np.ndarray:
+    """Read, featurize and classify one window; return a uint8 label block."""
+    data = read_window(band_sources, window)
+    valid_mask = compute_valid_mask(data, band_nodata(band_sources))
+    features = prepare_features(data, valid_mask=valid_mask)
+    predictions = classifier.predict(features, valid_mask, nodata)
+    return predictions.reshape(data.shape[1], data.shape[2]).astype("uint8")
+
+
+def check_band_layout(
+    classifier: Sentinel2Classifier,
+    n_bands: int,
+    band_order: Optional[List[str]] = None,
+    target_resolution: Optional[int] = None,
+) -> None:
+    """Raise ValueError if the classifier cannot be applied to these band sources.
+
+    The windowed engines feed raw bands without spectral indices, so a forest
+    recorded with indices is rejected as well.
+    """
+    if band_order is not None and len(band_order) != n_bands:
+        raise ValueError(f"band_order names {len(band_order)} bands, got {n_bands}")
+    classifier.check_features(band_order, target_resolution, indices=[])
+
+
+def classify_raster_windowed(
+    classifier: Sentinel2Classifier,
+    sources: Union[str, Sequence[str]],
+    output_path: str,
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    nodata: int = CLASS_NODATA,
+    band_order: Optional[List[str]] = None,
+    target_resolution: Optional[int] = None,
+) -> dict:
+    """Classify a raster window by window so peak memory stays within the budget.
+
+    ``sources`` is either a multi-band raster path or a list of single-band
+    raster paths on the same grid (e.g. the JP2 files of one resolution).
+    Pixels equal to the nodata value of any band source (see ``band_nodata``)
+    are skipped and written as *nodata*.
+    *band_order* and *target_resolution* describe the sources and are checked
+    against the layout a compact forest model was trained on.
+    """
+    with ExitStack() as stack:
+        band_sources = open_band_sources(stack, sources)
+        check_band_layout(classifier, len(band_sources), band_order, target_resolution)
+        ref = band_sources[0][0]
+        height, width = ref.height, ref.width
+
+        n_classes = len(getattr(classifier.classifier, "classes_", [])) or (
+            DEFAULT_N_CLASSES
+        )
+        bytes_per_pixel = estimate_bytes_per_pixel(
+            len(band_sources), np.dtype(ref.dtypes[0]).itemsize, n_classes
+        )
+        rows_per_window = plan_rows_per_window(
+            height, width, bytes_per_pixel, memory_budget_mb, ref.block_shapes[0][0]
+        )
+        logger.info(
+            f"Classifying {width}x{height} raster in windows of {rows_per_window} rows "
+            f"(budget {memory_budget_mb} MB)"
+        )
+
+        writer = stack.enter_context(
+            ClassifiedRasterWriter(output_path, ref.profile, nodata)
+        )
+
+        for window in iter_row_windows(height, width, rows_per_window):
+            labels = classify_window(classifier, band_sources, window, nodata)
+            writer.write(labels, window)
+            logger.debug(f"Classified window {window}")
+
+    if classifier.memo is not None:
+        logger.info(f"Deduplicated prediction: {classifier.memo.report()}")
+    logger.info(f"Classified raster saved to {output_path}")
+    return writer.profile
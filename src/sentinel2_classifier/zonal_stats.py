@@ -0,0 +1,137 @@
+import csv
+import json
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import rasterio
+from rasterio.features import rasterize
+from rasterio.windows import bounds as window_bounds
+from rasterio.windows import transform as window_transform
+
+from .geospatial_utils import RoiIndex, load_geojson, validate_and_transform_crs
+from .logging_config import get_logger
+from .masking import CLASS_NODATA
+from .streaming import DEFAULT_MEMORY_BUDGET_MB, iter_row_windows, plan_rows_per_window
+
+logger = get_logger(__name__)
+
+# Label block, zone ids, the combined (zone, class) key and masks
+_BYTES_PER_PIXEL = 1 + 4 + 8 + 2
+
+# Distinct values of a uint8 class raster
+_CLASS_SLOTS = 256
+
+
+def zonal_class_counts(
+    classified_path: str,
+    geojson: Union[str, dict],
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    all_touched: bool = False,
+) -> np.ndarray:
+    """Count the pixels of each class in each feature of a FeatureCollection.
+
+    Features are rasterized window by window onto the grid of the classified
+    raster as zone ids and the (zone, class) pairs are accumulated with
+    ``np.bincount``, so memory stays within *memory_budget_mb* whatever the
+    raster size. Windows that no feature's bounding box overlaps are not
+    read. Where features overlap, the later one in the file wins.
+
+    Returns a (features x 256) int64 array indexed by feature position and
+    class value; nodata pixels are not counted.
+    """
+    if isinstance(geojson, str):
+        geojson = load_geojson(geojson)
+
+    with rasterio.open(classified_path) as src:
+        geojson = validate_and_transform_crs(geojson, str(src.crs))
+        index = RoiIndex(geojson)
+        nodata = CLASS_NODATA if src.nodata is None else int(src.nodata)
+
+        rows_per_window = plan_rows_per_window(
+            src.height,
+            src.width,
+            _BYTES_PER_PIXEL,
+            memory_budget_mb,
+            src.block_shapes[0][0],
+        )
+        # Zone 0 is "outside every feature"
+        counts = np.zeros((len(index) + 1) * _CLASS_SLOTS, dtype=np.int64)
+
+        for window in iter_row_windows(src.height, src.width, rows_per_window):
+            overlapping = index.query(window_bounds(window, src.transform))
+            if not len(overlapping):
+                continue
+            zones = rasterize(
+                [(index.features[i]["geometry"], i + 1) for i in overlapping],
+                out_shape=(int(window.height), int(window.width)),
+                transform=window_transform(window, src.transform),
+                fill=0,
+                all_touched=all_touched,
+                dtype="uint32",
+            )
+            labels = src.read(1, window=window)
+            counted = (zones > 0) & (labels != nodata)
+            keys = zones[counted].astype(np.int64) * _CLASS_SLOTS + labels[counted]
+            window_counts = np.bincount(keys)
+            counts[: window_counts.size] += window_counts
+
+    return counts.reshape(-1, _CLASS_SLOTS)[1:]
+
+
+def zonal_class_stats(
+    classified_path: str,
+    geojson: Union[str, dict],
+    memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+    all_touched: bool = False,
+    name_property: Optional[str] = "name",
+) -> List[dict]:
+    """Return per-feature land-cover statistics of a classified raster.
+
+    One row per (feature, class) with any pixels: ``zone`` (feature position
+    in the file), ``name`` (its *name_property*, if set), ``class``, ``pixels``,
+    ``area`` in squared CRS units (m² for UTM tiles) and ``fraction`` of the
+    feature's classified pixels. See ``zonal_class_counts``.
+    """
+    if isinstance(geojson, str):
+        geojson = load_geojson(geojson)
+    counts = zonal_class_counts(classified_path, geojson, memory_budget_mb, all_touched)
+
+    with rasterio.open(classified_path) as src:
+        transform = src.transform
+    pixel_area = abs(transform.a * transform.e - transform.b * transform.d)
+
+    rows = []
+    totals = counts.sum(axis=1)
+    for zone, cls in zip(*np.nonzero(counts)):
+        feature = geojson["features"][zone]
+        properties = feature.get("properties") or {}
+        pixels = int(counts[zone, cls])
+        rows.append(
+            {
+                "zone": int(zone),
+                "name": properties.get(name_property) if name_property else None,
+                "class": int(cls),
+                "pixels": pixels,
+                "area": pixels * pixel_area,
+                "fraction": round(float(pixels / totals[zone]), 6),
+            }
+        )
+    logger.info(
+        f"Zonal statistics: {np.count_nonzero(totals)} of {len(counts)} features, "
+        f"{int(totals.sum())} classified pixels"
+    )
+    return rows
+
+
+def write_zonal_stats(rows: Sequence[dict], path: str) -> None:
+    """Write zonal statistics as CSV when *path* ends in ``.csv``, JSON otherwise."""
+    fields = ["zone", "name", "class", "pixels", "area", "fraction"]
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w") as f:
+            json.dump(list(rows), f, indent=2)
+    logger.info(f"Zonal statistics saved to {path}")
@@ -0,0 +1,4 @@
+import os
+
+# Keep test runs out of the user's band cache
+os.environ.setdefault("SENTINEL2_CACHE_MAX_BYTES", "0")
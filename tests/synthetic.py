@@ -0,0 +1,70 @@
+"""Small synthetic rasters and SAFE products for the tests."""
+
+import os
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+from sklearn.ensemble import RandomForestClassifier
+
+CRS = "EPSG:32614"
+ORIGIN = (400000, 2200000)
+
+
+def write_raster(path, data, resolution=10, nodata=0):
+    """Write a (bands, rows, cols) array as a tiled GeoTIFF on the test grid."""
+    data = np.asarray(data)
+    if data.ndim == 2:
+        data = data[None]
+    profile = {
+        "driver": "GTiff",
+        "count": data.shape[0],
+        "height": data.shape[1],
+        "width": data.shape[2],
+        "dtype": data.dtype,
+        "crs": CRS,
+        "transform": from_origin(*ORIGIN, resolution, resolution),
+        "nodata": nodata,
+        "tiled": True,
+        "blockxsize": 64,
+        "blockysize": 64,
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+    return path
+
+
+def reflectances(rng, shape):
+    """Random uint16 reflectances (never 0, the Sentinel-2 nodata value)."""
+    return rng.integers(1, 10000, shape, dtype=np.uint16)
+
+
+def make_safe_product(root, bands_by_resolution, size=120, seed=0):
+    """Create a minimal L2A SAFE folder; return its path.
+
+    Band files are GeoTIFFs named like the L2A JP2s, which GDAL opens by
+    content. *size* is the width and height of the 10 m grid.
+    """
+    rng = np.random.default_rng(seed)
+    safe_folder = os.path.join(root, "S2A_MSIL2A_TEST.SAFE")
+    granule = os.path.join(safe_folder, "GRANULE", "L2A_T14QMG_A000001_TEST")
+    for resolution, bands in bands_by_resolution.items():
+        img_folder = os.path.join(granule, "IMG_DATA", f"R{resolution}m")
+        os.makedirs(img_folder, exist_ok=True)
+        n = size * 10 // resolution
+        for band in bands:
+            name = f"T14QMG_20250813T165911_{band}_{resolution}m.jp2"
+            write_raster(
+                os.path.join(img_folder, name),
+                reflectances(rng, (n, n)),
+                resolution,
+            )
+    return safe_folder
+
+
+def fit_forest(n_features, seed=0, n_estimators=5):
+    """Fit a small forest on random pixels labelled by band thresholds."""
+    rng = np.random.default_rng(seed)
+    pixels = reflectances(rng, (2000, n_features)).astype(np.float32)
+    labels = (pixels[:, 0] > 5000).astype(int) + 2 * (pixels[:, -1] > 3000)
+    return RandomForestClassifier(n_estimators, random_state=seed).fit(pixels, labels)
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.sentinel2_classifier.data_loader import prepare_features
+from src.sentinel2_classifier.feature_store import FeatureStore, build_feature_store
+from src.sentinel2_classifier.masking import compute_valid_mask
+from src.sentinel2_classifier.resampling import load_sentinel2_safe_folder
+
+from .synthetic import make_safe_product
+
+BANDS_BY_RESOLUTION = {
+    10: ["B02", "B03", "B04", "B08"],
+    20: ["B02", "B03", "B04", "B8A", "B11"],
+}
+# Sorted, the order bands are stacked in
+BAND_ORDER = ["B04", "B08", "B11", "B8A"]
+INDICES = ["ndvi"]
+
+
+def threshold_labels(data, valid_mask):
+    return (data[0][valid_mask] > 5000).astype(np.uint8)
+
+
+class FeatureStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.safe_folder = make_safe_product(self.tmp_dir.name, BANDS_BY_RESOLUTION)
+        self.store = FeatureStore(os.path.join(self.tmp_dir.name, "store"))
+
+    def extract(self, **kwargs):
+        return self.store.extract(
+            self.safe_folder,
+            10,
+            BAND_ORDER,
+            threshold_labels,
+            indices=INDICES,
+            **kwargs,
+        )
+
+    def test_columns_match_in_memory_features(self):
+        # A small budget streams the scene in many windows
+        key = self.extract(memory_budget_mb=0.05)
+        data, _ = load_sentinel2_safe_folder(
+            self.safe_folder, 10, BAND_ORDER, cache=None
+        )
+        valid_mask = compute_valid_mask(data)
+        expected = prepare_features(
+            data, band_order=BAND_ORDER, indices=INDICES, valid_mask=valid_mask
+        )
+
+        features, labels = self.store.load(key)
+        self.assertEqual(self.store.feature_columns(key), BAND_ORDER + INDICES)
+        np.testing.assert_array_equal(features, expected)
+        np.testing.assert_array_equal(labels, threshold_labels(data, valid_mask))
+        np.testing.assert_array_equal(
+            self.store.open_columns(key, ["pixel_index"])["pixel_index"],
+            np.flatnonzero(valid_mask),
+        )
+
+        batches = list(self.store.iter_batches([key], batch_rows=1000))
+        np.testing.assert_array_equal(
+            np.concatenate([batch for batch, _ in batches]), expected
+        )
+
+    def test_existing_entries_are_reused(self):
+        key = self.extract()
+        meta_path = os.path.join(self.store.root, key, "meta.json")
+        mtime = os.stat(meta_path).st_mtime_ns
+        self.assertEqual(self.extract(), key)
+        self.assertEqual(os.stat(meta_path).st_mtime_ns, mtime)
+        self.assertEqual(self.store.keys(), [key])
+
+    def test_build_feature_store_matches_extract(self):
+        keys = build_feature_store(
+            self.store.root,
+            [self.safe_folder],
+            10,
+            BAND_ORDER,
+            threshold_labels,
+            indices=INDICES,
+        )
+        self.assertEqual(keys, [self.extract()])
+
+    def test_other_store_versions_are_rejected(self):
+        key = self.extract()
+        meta_path = os.path.join(self.store.root, key, "meta.json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta["version"] = 0
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+        with self.assertRaises(ValueError):
+            self.store.load(key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.sentinel2_classifier import forest_format
+from src.sentinel2_classifier.classifier import Sentinel2Classifier
+from src.sentinel2_classifier.forest_format import FlatForest, is_forest_file
+
+from .synthetic import fit_forest, reflectances
+
+
+class ForestFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.estimator = fit_forest(n_features=4)
+        self.pixels = reflectances(np.random.default_rng(1), (500, 4)).astype(
+            np.float32
+        )
+        self.path = os.path.join(self.tmp_dir.name, "model.s2rf")
+        Sentinel2Classifier(self.estimator).export_model(
+            self.path, band_order=["B02", "B03", "B04", "B08"], target_resolution=10
+        )
+
+    def test_round_trip_predicts_like_the_original(self):
+        for mmap in (True, False):
+            forest = FlatForest.load(self.path, mmap=mmap).to_sklearn()
+            np.testing.assert_array_equal(
+                forest.predict_proba(self.pixels),
+                self.estimator.predict_proba(self.pixels),
+            )
+            np.testing.assert_array_equal(forest.classes_, self.estimator.classes_)
+
+    def test_load_model_reads_forest_files(self):
+        self.assertTrue(is_forest_file(self.path))
+        classifier = Sentinel2Classifier()
+        classifier.load_model(self.path)
+        np.testing.assert_array_equal(
+            classifier.predict(self.pixels), self.estimator.predict(self.pixels)
+        )
+        self.assertEqual(
+            classifier.classifier.forest_metadata_["band_order"],
+            ["B02", "B03", "B04", "B08"],
+        )
+
+    def test_feature_layout_is_checked(self):
+        classifier = Sentinel2Classifier()
+        classifier.load_model(self.path)
+        classifier.check_features(["B02", "B03", "B04", "B08"], 10, [])
+        with self.assertRaises(ValueError):
+            classifier.check_features(["B03", "B02", "B04", "B08"])
+        with self.assertRaises(ValueError):
+            classifier.check_features(target_resolution=20)
+        with self.assertRaises(ValueError):
+            classifier.check_features(indices=["ndvi"])
+
+    def test_rejects_other_files(self):
+        pickle_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        Sentinel2Classifier(self.estimator).save_model(pickle_path)
+        self.assertFalse(is_forest_file(pickle_path))
+        with self.assertRaises(ValueError):
+            FlatForest.load(pickle_path)
+
+    def test_unsupported_sklearn_fails_clearly(self):
+        forest = FlatForest.load(self.path)
+        with mock.patch.object(forest_format, "SUPPORTED_SKLEARN", ((0, 1), (0, 2))):
+            with self.assertRaisesRegex(ValueError, "scikit-learn >=0.1,<0.2"):
+                forest.to_sklearn()
+
+
+if __name__ == "__main__":
+    unittest.main()
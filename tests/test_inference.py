@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+
+from src.sentinel2_classifier.classifier import Sentinel2Classifier
+from src.sentinel2_classifier.data_loader import prepare_features
+from src.sentinel2_classifier.masking import CLASS_NODATA, compute_valid_mask
+from src.sentinel2_classifier.parallel_inference import classify_raster_parallel
+from src.sentinel2_classifier.streaming import classify_raster_windowed
+
+from .synthetic import fit_forest, reflectances, write_raster
+
+BAND_ORDER = ["B02", "B03", "B04"]
+
+
+class WindowedInferenceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        rng = np.random.default_rng(0)
+        self.data = reflectances(rng, (3, 300, 250))
+        # Nodata in different places per band, and a blank strip in all bands
+        self.data[0, 10:20, 30:40] = 0
+        self.data[2, 200:205, :] = 0
+        self.data[:, 100, :] = 0
+        self.image_path = write_raster(self.path("image.tif"), self.data)
+        self.classifier = Sentinel2Classifier(fit_forest(n_features=3))
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def expected_labels(self):
+        valid_mask = compute_valid_mask(self.data)
+        features = prepare_features(self.data, valid_mask=valid_mask)
+        labels = self.classifier.predict(features, valid_mask)
+        return labels.reshape(self.data.shape[1:])
+
+    def read_labels(self, path):
+        with rasterio.open(path) as src:
+            self.assertEqual(src.nodata, CLASS_NODATA)
+            return src.read(1)
+
+    def test_windowed_matches_full_image(self):
+        output_path = self.path("windowed.tif")
+        # A small budget forces many windows
+        classify_raster_windowed(
+            self.classifier, self.image_path, output_path, memory_budget_mb=0.5
+        )
+        labels = self.read_labels(output_path)
+        np.testing.assert_array_equal(labels, self.expected_labels())
+        self.assertTrue((labels[self.data.min(axis=0) == 0] == CLASS_NODATA).all())
+
+    def test_single_band_sources_match_multiband(self):
+        band_paths = [
+            write_raster(self.path(f"{band}.tif"), band_data)
+            for band, band_data in zip(BAND_ORDER, self.data)
+        ]
+        output_path = self.path("bands.tif")
+        classify_raster_windowed(
+            self.classifier, band_paths, output_path, memory_budget_mb=0.5
+        )
+        np.testing.assert_array_equal(
+            self.read_labels(output_path), self.expected_labels()
+        )
+
+    def test_parallel_matches_windowed(self):
+        windowed_path = self.path("windowed.tif")
+        classify_raster_windowed(
+            self.classifier, self.image_path, windowed_path, memory_budget_mb=0.5
+        )
+        for model_name in ("model.pkl", "model.s2rf"):
+            model_path = self.path(model_name)
+            if model_name.endswith(".pkl"):
+                self.classifier.save_model(model_path)
+            else:
+                self.classifier.export_model(model_path, BAND_ORDER, 10)
+            parallel_path = self.path(f"parallel_{model_name}.tif")
+            classify_raster_parallel(
+                model_path,
+                self.image_path,
+                parallel_path,
+                n_workers=2,
+                memory_budget_mb=0.5,
+                band_order=BAND_ORDER,
+                target_resolution=10,
+            )
+            np.testing.assert_array_equal(
+                self.read_labels(parallel_path), self.read_labels(windowed_path)
+            )
+
+    def test_missing_nodata_tag_falls_back_to_zero(self):
+        image_path = write_raster(self.path("untagged.tif"), self.data, nodata=None)
+        output_path = self.path("untagged_labels.tif")
+        classify_raster_windowed(self.classifier, image_path, output_path)
+        np.testing.assert_array_equal(
+            self.read_labels(output_path), self.expected_labels()
+        )
+
+    def test_layout_mismatch_is_rejected(self):
+        model_path = self.path("model.s2rf")
+        self.classifier.export_model(model_path, BAND_ORDER, 10)
+        with self.assertRaises(ValueError):
+            classify_raster_windowed(
+                self.classifier,
+                self.image_path,
+                self.path("out.tif"),
+                band_order=["B02", "B03"],
+            )
+        with self.assertRaises(ValueError):
+            classify_raster_parallel(
+                model_path,
+                self.image_path,
+                self.path("out.tif"),
+                n_workers=1,
+                band_order=["B03", "B02", "B04"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
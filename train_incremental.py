@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Train one model out of core on many Sentinel-2 SAFE products."""
+
+import json
+
+from sklearn.ensemble import RandomForestClassifier
+
+from src.sentinel2_classifier import (
+    Sentinel2Classifier,
+    create_sample_labels_from_index,
+    scan_safe_products,
+    setup_logger,
+    train_incremental,
+)
+
+# Setup logging
+logger = setup_logger("train_incremental", level="INFO")
+
+
+def load_config(config_path="config.json"):
+    """Load configuration from JSON file."""
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def main():
+    # Load configuration
+    config = load_config()
+    target_resolution = config["target_resolution"]
+    band_order = sorted(config["selected_bands"])
+    # Either an explicit list of products or a directory holding *.SAFE folders
+    safe_folders = config.get("safe_folders")
+    if safe_folders is None and "safe_directory" in config:
+        safe_folders = [p.path for p in scan_safe_products(config["safe_directory"])]
+    if safe_folders is None:
+        safe_folders = [config["safe_folder"]]
+    max_samples_per_class = config.get("max_samples_per_class", 100_000)
+    memory_budget_mb = config.get("memory_budget_mb", 256)  # Per batch
+    checkpoint_path = config.get("checkpoint_path", "training_checkpoint.pkl")
+    max_workers = config.get("max_workers")  # Band decoding threads
+
+    try:
+        classifier = Sentinel2Classifier(
+            RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+        )
+
+        # Stream every window of every product into a class-balanced reservoir;
+        # rerunning after an interruption resumes from the checkpoint
+        logger.info(f"Training on {len(safe_folders)} products...")
+        train_incremental(
+            classifier,
+            safe_folders,
+            band_order,
+            target_resolution,
+            lambda data, valid_mask: create_sample_labels_from_index(
+                data, band_order, valid_mask
+            ),
+            max_samples_per_class=max_samples_per_class,
+            memory_budget_mb=memory_budget_mb,
+            checkpoint_path=checkpoint_path,
+            max_workers=max_workers,
+        )
+
+        classifier.save_model("incremental_model.pkl")
+        classifier.export_model("incremental_model.s2rf", band_order, target_resolution)
+        logger.info("Model saved: incremental_model.pkl, incremental_model.s2rf")
+
+    except FileNotFoundError:
+        logger.error("Please provide valid Sentinel-2 SAFE folder paths")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 
-from src.sentinel2_classifier import get_logger, setup_logger
+from src.sentinel2_classifier import compute_valid_mask, get_logger, setup_logger
 from src.sentinel2_classifier.classifier import Sentinel2Classifier
 from src.sentinel2_classifier.data_loader import (
     create_sample_labels_from_index,
@@ -24,16 +24,19 @@ def main():
         data, profile = load_sentinel2_image(image_path)
         logger.info(f"Loaded image with shape: {data.shape}")
 
+        # Skip nodata pixels
+        valid_mask = compute_valid_mask(data, profile.get("nodata"))
+
         # Prepare features
-        features = prepare_features(data)
+        features = prepare_features(data, valid_mask=valid_mask)
 
         # Create labels from NDVI/NDWI indices
-        labels = create_sample_labels_from_index(data)
+        labels = create_sample_labels_from_index(data, valid_mask=valid_mask)
         logger.info(f"Generated {len(np.unique(labels))} classes from indices")
 
         # Initialize classifier (easily switchable)
         classifier = Sentinel2Classifier(
-            RandomForestClassifier(n_estimators=100, random_state=42)
+            RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
         )
         # classifier = Sentinel2Classifier(SVC(kernel='rbf', random_state=42))  # Alternative
 